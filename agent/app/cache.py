@@ -0,0 +1,50 @@
+"""Short-lived in-process caches for tool and LLM results."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import orjson
+
+
+class ResultCache:
+    """LRU cache with a per-entry TTL for JSON-serializable results.
+
+    Results are stored encoded, so each hit decodes a fresh copy the
+    caller is free to mutate.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, bytes]] = OrderedDict()
+
+    @staticmethod
+    def make_key(*parts: Any) -> bytes:
+        """Build a deterministic key from JSON-serializable parts."""
+        return orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+
+    def get(self, key: bytes) -> Optional[dict[str, Any]]:
+        """Return a cached result, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return orjson.loads(data)
+
+    def set(self, key: bytes, result: dict[str, Any]) -> None:
+        """Store a result, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, orjson.dumps(result))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
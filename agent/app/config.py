@@ -18,6 +18,16 @@ class Settings(BaseSettings):
     # Safety
     approval_required: bool = True
 
+    # Tool execution
+    parallel_tool_calls: bool = True
+    tool_concurrency_limit: int = 8
+    tool_cache_ttl: float = 30.0
+    tool_cache_size: int = 512
+
+    # LLM response cache (0 disables)
+    llm_cache_ttl: float = 600.0
+    llm_cache_size: int = 256
+
     class Config:
         env_file = ".env"
 
@@ -1,10 +1,87 @@
 """Fallback analyzer for when no LLM is available."""
 
+import heapq
 import re
 from typing import Optional
 from .models import AgentResponse, Evidence, UIHints, ActionRequest
 
 
+# Path extraction for record requests (e.g. "record /demo/slow")
+_PATH_RE = re.compile(r'/\w+(?:/\w+)*')
+
+# Intent keywords, matched as substrings of the query. Order is priority:
+# the first intent with any keyword present wins.
+_INTENT_WORDS = {
+    "record": ("record", "capture", "create trace", "make request"),
+    "slow": ("slow", "bottleneck", "performance", "latency", "duration"),
+    "error": ("error", "fail", "exception", "500", "bug"),
+    "list": ("list", "show", "recent", "traces", "what traces"),
+    "explain": ("explain", "what", "how", "why", "describe", "summary"),
+}
+
+# All keywords compiled into one alternation so a single scan of the query
+# finds every intent. The zero-width lookahead tries a match at every
+# position, so overlapping keywords (e.g. "show" and "how") are all seen.
+_INTENT_RE = re.compile(
+    "(?=(?:"
+    + "|".join(
+        f"(?P<{intent}>{'|'.join(map(re.escape, words))})"
+        for intent, words in _INTENT_WORDS.items()
+    )
+    + "))",
+    re.IGNORECASE,
+)
+
+# Tags reported for each error span in analyze_trace_for_errors
+_ERROR_DETAIL_KEYS = frozenset({"http.status_code", "error.message", "exception.message"})
+
+
+# Static answer bodies and section headers
+_NO_SPANS_ANSWER = "No spans found in this trace."
+
+_NO_ERRORS_ANSWER = (
+    "**No errors found in this trace.**\n\n"
+    "All spans completed successfully without error tags or HTTP 5xx status codes."
+)
+
+_NO_TRACE_ANSWER = (
+    "**No trace selected.**\n\n"
+    "Please select a trace from the list on the left, or click 'Record' to create a new one.\n\n"
+    "I can help you:\n"
+    "- Analyze slow spans and bottlenecks\n"
+    "- Find errors in traces\n"
+    "- Explain what happened in a request flow"
+)
+
+_UNKNOWN_ANSWER = (
+    "I'm not sure what you're asking. Here are some things I can help with:\n\n"
+    "- **\"What's slow?\"** - Find bottlenecks in the selected trace\n"
+    "- **\"Any errors?\"** - Find error spans\n"
+    "- **\"Explain this trace\"** - Get a summary of what happened\n"
+    "- **\"Record /demo/slow\"** - Create a new trace\n"
+    "- **\"List traces\"** - Show recent traces"
+)
+
+_SLOW_HEADER_TMPL = (
+    "**Trace Analysis: Slowest Operations**\n\n"
+    "Total trace duration: {duration_ms:.1f}ms with {span_count} spans.\n\n"
+    "**Top 5 slowest operations:**\n"
+)
+
+_ERROR_HEADER_TMPL = (
+    "**Trace Analysis: Errors Found**\n\n"
+    "Found {error_count} error(s) in this trace:\n\n"
+)
+
+_SUMMARY_HEADER_TMPL = (
+    "**Trace Summary**\n\n"
+    "- **Trace ID**: `{trace_id}`\n"
+    "- **Total duration**: {duration_ms:.1f}ms\n"
+    "- **Spans**: {span_count}\n"
+    "- **Services**: {services}\n\n"
+)
+
+
 def analyze_query(query: str) -> dict:
     """
     Analyze the user's query to understand intent.
@@ -13,30 +90,19 @@ def analyze_query(query: str) -> dict:
     - intent: 'slow', 'error', 'explain', 'record', 'list', 'unknown'
     - parameters: any extracted parameters
     """
-    query_lower = query.lower()
-
-    # Check for recording intent
-    if any(word in query_lower for word in ["record", "capture", "create trace", "make request"]):
-        # Try to extract path
-        path_match = re.search(r'/\w+(?:/\w+)*', query)
-        path = path_match.group(0) if path_match else "/demo/slow"
-        return {"intent": "record", "parameters": {"path": path}}
-
-    # Check for slowness analysis
-    if any(word in query_lower for word in ["slow", "bottleneck", "performance", "latency", "duration"]):
-        return {"intent": "slow", "parameters": {}}
+    found = {m.lastgroup for m in _INTENT_RE.finditer(query)}
 
-    # Check for error analysis
-    if any(word in query_lower for word in ["error", "fail", "exception", "500", "bug"]):
-        return {"intent": "error", "parameters": {}}
+    for intent in _INTENT_WORDS:
+        if intent not in found:
+            continue
 
-    # Check for listing traces
-    if any(word in query_lower for word in ["list", "show", "recent", "traces", "what traces"]):
-        return {"intent": "list", "parameters": {}}
+        if intent == "record":
+            # Try to extract path
+            path_match = _PATH_RE.search(query)
+            path = path_match.group(0) if path_match else "/demo/slow"
+            return {"intent": "record", "parameters": {"path": path}}
 
-    # Check for explanation
-    if any(word in query_lower for word in ["explain", "what", "how", "why", "describe", "summary"]):
-        return {"intent": "explain", "parameters": {}}
+        return {"intent": intent, "parameters": {}}
 
     return {"intent": "unknown", "parameters": {}}
 
@@ -47,27 +113,33 @@ def analyze_trace_for_slowness(trace_data: dict) -> AgentResponse:
 
     if not spans:
         return AgentResponse(
-            answer="No spans found in this trace.",
+            answer=_NO_SPANS_ANSWER,
             evidence=Evidence(traceId=trace_data.get("traceID")),
             ui=UIHints()
         )
 
-    # Sort spans by duration
-    sorted_spans = sorted(spans, key=lambda s: s.get("duration", 0), reverse=True)
-    top_slow = sorted_spans[:5]
+    # Bind dict.get once for the per-span loops below
+    _get = dict.get
 
-    # Calculate total trace duration
-    if spans:
-        min_start = min(s.get("startTime", 0) for s in spans)
-        max_end = max(s.get("startTime", 0) + s.get("duration", 0) for s in spans)
-        total_duration_ms = (max_end - min_start) / 1000
-    else:
-        total_duration_ms = 0
+    # Calculate total trace duration in a single pass
+    min_start = float("inf")
+    max_end = 0
+    for span in spans:
+        start_time = _get(span, "startTime", 0)
+        end_time = start_time + _get(span, "duration", 0)
+        if start_time < min_start:
+            min_start = start_time
+        if end_time > max_end:
+            max_end = end_time
+    total_duration_ms = (max_end - min_start) / 1000
+
+    # Pick the slowest spans without sorting the whole trace
+    top_slow = heapq.nlargest(5, spans, key=lambda s: _get(s, "duration", 0))
 
     # Build answer
-    answer = f"**Trace Analysis: Slowest Operations**\n\n"
-    answer += f"Total trace duration: {total_duration_ms:.1f}ms with {len(spans)} spans.\n\n"
-    answer += "**Top 5 slowest operations:**\n"
+    parts: list[str] = [
+        _SLOW_HEADER_TMPL.format(duration_ms=total_duration_ms, span_count=len(spans))
+    ]
 
     highlight_nodes = []
     for i, span in enumerate(top_slow, 1):
@@ -78,10 +150,11 @@ def analyze_trace_for_slowness(trace_data: dict) -> AgentResponse:
         # Calculate percentage of total
         pct = (duration_ms / total_duration_ms * 100) if total_duration_ms > 0 else 0
 
-        answer += f"{i}. **{op_name}**: {duration_ms:.1f}ms ({pct:.1f}% of total)\n"
+        parts.append(f"{i}. **{op_name}**: {duration_ms:.1f}ms ({pct:.1f}% of total)\n")
         highlight_nodes.append(f"span:{span_id}")
 
-    answer += "\n*Highlighted spans are shown in the graph.*"
+    parts.append("\n*Highlighted spans are shown in the graph.*")
+    answer = "".join(parts)
 
     return AgentResponse(
         answer=answer,
@@ -97,15 +170,18 @@ def analyze_trace_for_errors(trace_data: dict) -> AgentResponse:
     """Analyze a trace for error spans."""
     spans = trace_data.get("spans", [])
 
+    # Bind dict.get once for the per-span/per-tag loops below
+    _get = dict.get
+
     # Find error spans
     error_spans = []
     for span in spans:
-        tags = span.get("tags", [])
+        tags = _get(span, "tags", [])
         has_error = False
 
         for tag in tags:
-            key = tag.get("key", "")
-            value = tag.get("value")
+            key = _get(tag, "key", "")
+            value = _get(tag, "value")
 
             if key == "error" and value is True:
                 has_error = True
@@ -114,39 +190,50 @@ def analyze_trace_for_errors(trace_data: dict) -> AgentResponse:
             elif key == "otel.status_code" and value == "ERROR":
                 has_error = True
 
+            if has_error:
+                break
+
         if has_error:
             error_spans.append(span)
 
     if not error_spans:
         return AgentResponse(
-            answer="**No errors found in this trace.**\n\nAll spans completed successfully without error tags or HTTP 5xx status codes.",
+            answer=_NO_ERRORS_ANSWER,
             evidence=Evidence(traceId=trace_data.get("traceID")),
             ui=UIHints()
         )
 
     # Build answer
-    answer = f"**Trace Analysis: Errors Found**\n\n"
-    answer += f"Found {len(error_spans)} error(s) in this trace:\n\n"
+    parts: list[str] = [_ERROR_HEADER_TMPL.format(error_count=len(error_spans))]
 
     highlight_nodes = []
     for i, span in enumerate(error_spans, 1):
         op_name = span.get("operationName", "unknown")
         span_id = span.get("spanID", "")
 
-        # Get error details from tags
-        tags = {t.get("key"): t.get("value") for t in span.get("tags", [])}
-        status_code = tags.get("http.status_code", "N/A")
-        error_msg = tags.get("error.message", tags.get("exception.message", ""))
-
-        answer += f"{i}. **{op_name}**\n"
-        answer += f"   - Status code: {status_code}\n"
+        # Get error details from tags, stopping once all are found
+        details = {}
+        for tag in span.get("tags", []):
+            key = tag.get("key")
+            if key in _ERROR_DETAIL_KEYS and key not in details:
+                details[key] = tag.get("value")
+                if len(details) == len(_ERROR_DETAIL_KEYS):
+                    break
+        status_code = details.get("http.status_code", "N/A")
+        error_msg = details.get("error.message", details.get("exception.message", ""))
+
+        parts.append(f"{i}. **{op_name}**\n")
+        parts.append(f"   - Status code: {status_code}\n")
         if error_msg:
-            answer += f"   - Message: {error_msg[:100]}\n"
-        answer += "\n"
+            if len(error_msg) > 100:
+                error_msg = f"{error_msg[:100]}…"
+            parts.append(f"   - Message: {error_msg}\n")
+        parts.append("\n")
 
         highlight_nodes.append(f"span:{span_id}")
 
-    answer += "*Error spans are highlighted in red in the graph.*"
+    parts.append("*Error spans are highlighted in red in the graph.*")
+    answer = "".join(parts)
 
     return AgentResponse(
         answer=answer,
@@ -165,51 +252,70 @@ def explain_trace(trace_data: dict) -> AgentResponse:
 
     if not spans:
         return AgentResponse(
-            answer="No spans found in this trace.",
+            answer=_NO_SPANS_ANSWER,
             evidence=Evidence(traceId=trace_data.get("traceID")),
             ui=UIHints()
         )
 
-    # Gather statistics
-    services = set()
-    operations = []
-    total_duration_ms = 0
+    # Bind dict.get once for the per-span loop below
+    _get = dict.get
 
-    for span in spans:
-        process_id = span.get("processID", "")
-        process = processes.get(process_id, {})
-        services.add(process.get("serviceName", "unknown"))
-        operations.append(span.get("operationName", "unknown"))
+    # Resolve service names once per process rather than once per span
+    pid_to_service = {
+        pid: process.get("serviceName", "unknown")
+        for pid, process in processes.items()
+    }
 
-    if spans:
-        min_start = min(s.get("startTime", 0) for s in spans)
-        max_end = max(s.get("startTime", 0) + s.get("duration", 0) for s in spans)
-        total_duration_ms = (max_end - min_start) / 1000
-
-    # Find root span
+    # Gather statistics, time bounds, and the root span in a single pass
+    services = set()
+    operations = []
+    min_start = float("inf")
+    max_end = 0
     root_span = None
+
     for span in spans:
-        refs = span.get("references", [])
-        if not any(r.get("refType") == "CHILD_OF" for r in refs):
-            root_span = span
-            break
+        services.add(pid_to_service.get(_get(span, "processID", ""), "unknown"))
+        operations.append(_get(span, "operationName", "unknown"))
+
+        start_time = _get(span, "startTime", 0)
+        end_time = start_time + _get(span, "duration", 0)
+        if start_time < min_start:
+            min_start = start_time
+        if end_time > max_end:
+            max_end = end_time
+
+        # Root span is the first one with no parent; once found, skip the check
+        if root_span is None:
+            for ref in _get(span, "references", ()):
+                if _get(ref, "refType") == "CHILD_OF":
+                    break
+            else:
+                root_span = span
+
+    total_duration_ms = (max_end - min_start) / 1000
 
     # Build answer
-    answer = f"**Trace Summary**\n\n"
-    answer += f"- **Trace ID**: `{trace_data.get('traceID', 'unknown')}`\n"
-    answer += f"- **Total duration**: {total_duration_ms:.1f}ms\n"
-    answer += f"- **Spans**: {len(spans)}\n"
-    answer += f"- **Services**: {', '.join(services)}\n\n"
+    parts: list[str] = [
+        _SUMMARY_HEADER_TMPL.format(
+            trace_id=trace_data.get("traceID", "unknown"),
+            duration_ms=total_duration_ms,
+            span_count=len(spans),
+            services=", ".join(services),
+        )
+    ]
 
     if root_span:
-        answer += f"**Entry point**: {root_span.get('operationName', 'unknown')}\n\n"
+        parts.append(f"**Entry point**: {root_span.get('operationName', 'unknown')}\n\n")
 
-    answer += "**Operations in this trace:**\n"
+    parts.append("**Operations in this trace:**\n")
     for op in operations[:10]:
-        answer += f"- {op}\n"
+        parts.append(f"- {op}\n")
+
+    op_count = len(operations)
+    if op_count > 10:
+        parts.append(f"- ... and {op_count - 10} more\n")
 
-    if len(operations) > 10:
-        answer += f"- ... and {len(operations) - 10} more\n"
+    answer = "".join(parts)
 
     # Highlight root span
     highlight_nodes = []
@@ -243,7 +349,7 @@ def generate_record_action(path: str) -> AgentResponse:
 def no_trace_response() -> AgentResponse:
     """Response when no trace is selected."""
     return AgentResponse(
-        answer="**No trace selected.**\n\nPlease select a trace from the list on the left, or click 'Record' to create a new one.\n\nI can help you:\n- Analyze slow spans and bottlenecks\n- Find errors in traces\n- Explain what happened in a request flow",
+        answer=_NO_TRACE_ANSWER,
         evidence=Evidence(),
         ui=UIHints()
     )
@@ -252,12 +358,7 @@ def no_trace_response() -> AgentResponse:
 def unknown_intent_response() -> AgentResponse:
     """Response for unknown queries."""
     return AgentResponse(
-        answer="I'm not sure what you're asking. Here are some things I can help with:\n\n"
-               "- **\"What's slow?\"** - Find bottlenecks in the selected trace\n"
-               "- **\"Any errors?\"** - Find error spans\n"
-               "- **\"Explain this trace\"** - Get a summary of what happened\n"
-               "- **\"Record /demo/slow\"** - Create a new trace\n"
-               "- **\"List traces\"** - Show recent traces",
+        answer=_UNKNOWN_ANSWER,
         evidence=Evidence(),
         ui=UIHints()
     )
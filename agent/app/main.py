@@ -1,18 +1,40 @@
 """Main FastAPI application for OpenTrace Agent service."""
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import httpx
 
 from .config import get_settings
 from .models import ChatRequest, AgentResponse
+from .openrouter import get_openrouter_client
 from .planner import get_agent_planner
+from .tools import get_tool_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan handler."""
+    # Startup
+    app.state.http = httpx.AsyncClient(timeout=30.0)
+    # Connect to OpenRouter in the background so startup isn't blocked
+    app.state.warmup = asyncio.create_task(get_openrouter_client().warmup())
+    yield
+    # Shutdown
+    app.state.warmup.cancel()
+    await app.state.http.aclose()
+    await get_openrouter_client().close()
+    await get_tool_executor().close()
 
 
 app = FastAPI(
     title="OpenTrace Agent",
     description="AI-powered trace analysis agent",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -25,9 +47,8 @@ app.add_middleware(
 )
 
 
-@app.get("/health")
-async def health_check():
-    """Check agent service health."""
+def _build_health_payload() -> dict:
+    """Build the static /health response from settings."""
     settings = get_settings()
     return {
         "status": "healthy",
@@ -37,6 +58,16 @@ async def health_check():
     }
 
 
+# Settings are fixed for the life of the process, so the health payload is too
+_HEALTH_PAYLOAD = _build_health_payload()
+
+
+@app.get("/health")
+async def health_check():
+    """Check agent service health."""
+    return _HEALTH_PAYLOAD
+
+
 @app.post("/chat", response_model=AgentResponse)
 async def chat(request: ChatRequest):
     """
@@ -66,12 +97,13 @@ async def execute_action(action: dict):
     if action_type == "record":
         # Execute the record request
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{settings.api_url}/record",
-                    json=params
-                )
-                return response.json()
+            response = await app.state.http.post(
+                f"{settings.api_url}/record",
+                json=params
+            )
+            # Cached trace results predate the new recording
+            get_tool_executor().clear_cache()
+            return response.json()
         except Exception as e:
             raise HTTPException(
                 status_code=500,
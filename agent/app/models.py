@@ -1,48 +1,53 @@
 """Pydantic models for Agent service."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
 from typing import Optional, Any
 
 
 class ChatRequest(BaseModel):
     """Request to chat with the agent."""
     message: str
-    selected_trace_id: Optional[str] = Field(None, alias="selectedTraceId")
-    selected_flow_id: Optional[str] = Field(None, alias="selectedFlowId")
-    ui_state: Optional[dict[str, Any]] = Field(None, alias="uiState")
+    selected_trace_id: Optional[str] = None
+    selected_flow_id: Optional[str] = None
+    ui_state: Optional[dict[str, Any]] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        alias_generator=to_camel, populate_by_name=True, defer_build=True
+    )
 
 
 class Evidence(BaseModel):
     """Evidence supporting an agent response."""
-    trace_id: Optional[str] = Field(None, alias="traceId")
-    span_ids: list[str] = Field(default_factory=list, alias="spanIds")
+    trace_id: Optional[str] = None
+    span_ids: list[str] = Field(default_factory=list)
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        alias_generator=to_camel, populate_by_name=True, defer_build=True
+    )
 
 
 class UIHints(BaseModel):
     """UI hints for highlighting and filtering."""
-    highlight_nodes: list[str] = Field(default_factory=list, alias="highlightNodes")
-    highlight_edges: list[str] = Field(default_factory=list, alias="highlightEdges")
-    suggested_filters: list[str] = Field(default_factory=list, alias="suggestedFilters")
+    highlight_nodes: list[str] = Field(default_factory=list)
+    highlight_edges: list[str] = Field(default_factory=list)
+    suggested_filters: list[str] = Field(default_factory=list)
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        alias_generator=to_camel, populate_by_name=True, defer_build=True
+    )
 
 
 class ActionRequest(BaseModel):
     """Request for an action that requires approval."""
-    action_type: str = Field(..., alias="actionType")
+    action_type: str
     description: str
     params: dict[str, Any]
-    requires_approval: bool = Field(True, alias="requiresApproval")
+    requires_approval: bool = True
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        alias_generator=to_camel, populate_by_name=True, defer_build=True
+    )
 
 
 class AgentResponse(BaseModel):
@@ -52,8 +57,9 @@ class AgentResponse(BaseModel):
     ui: UIHints = Field(default_factory=UIHints)
     actions: list[ActionRequest] = Field(default_factory=list)
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        alias_generator=to_camel, populate_by_name=True, defer_build=True
+    )
 
 
 class ToolCall(BaseModel):
@@ -61,9 +67,13 @@ class ToolCall(BaseModel):
     name: str
     arguments: dict[str, Any]
 
+    model_config = ConfigDict(defer_build=True)
+
 
 class ToolResult(BaseModel):
     """Result from executing a tool."""
     name: str
     result: Any
     error: Optional[str] = None
+
+    model_config = ConfigDict(defer_build=True)
@@ -1,7 +1,9 @@
 """OpenRouter API client for LLM interactions."""
 
 import httpx
-from typing import Optional
+import orjson
+from functools import lru_cache
+from typing import AsyncIterator, Optional
 import logging
 
 from .config import get_settings
@@ -135,6 +137,12 @@ When responding:
 Always use the available tools to get accurate data before making statements about traces."""
 
 
+# The system message and tool schema never change, so build them once.
+# The tool schema is pre-encoded and spliced into each payload as raw JSON.
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+_TOOLS_JSON = orjson.Fragment(orjson.dumps(TOOLS))
+
+
 class OpenRouterClient:
     """Client for OpenRouter API (unified LLM gateway)."""
 
@@ -143,11 +151,82 @@ class OpenRouterClient:
         self.api_key = self.settings.openrouter_api_key
         self.model = self.settings.openrouter_model
         self.base_url = self.settings.openrouter_base_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create HTTP client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=60.0,
+                http2=True,
+                limits=httpx.Limits(keepalive_expiry=300),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "HTTP-Referer": "https://opentrace.local",
+                    "X-Title": "OpenTrace",
+                },
+            )
+        return self._client
+
+    async def close(self):
+        """Close the HTTP client."""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+
+    async def warmup(self):
+        """Open a pooled connection (DNS, TCP, TLS) ahead of the first chat."""
+        if not self.is_available():
+            return
+        try:
+            client = await self._get_client()
+            await client.head("/models")
+        except Exception as e:
+            logger.warning(f"OpenRouter warmup failed: {e}")
 
     def is_available(self) -> bool:
         """Check if OpenRouter is configured."""
         return bool(self.api_key)
 
+    def _build_payload(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        stream: bool = False
+    ) -> bytes:
+        """Build the encoded request body for a chat completion."""
+        payload = {
+            "model": self.model,
+            "messages": messages,
+        }
+
+        if tools:
+            payload["tools"] = _TOOLS_JSON if tools is TOOLS else tools
+            payload["tool_choice"] = "auto"
+
+        if stream:
+            payload["stream"] = True
+
+        return orjson.dumps(payload)
+
+    def _build_tool_messages(
+        self,
+        user_message: str,
+        context: Optional[str] = None,
+        conversation_history: Optional[list[dict]] = None
+    ) -> list[dict]:
+        """Build the message list for a tool-enabled chat."""
+        messages = [_SYSTEM_MSG]
+
+        if conversation_history:
+            messages.extend(conversation_history)
+
+        if context:
+            user_message = f"{user_message}\n\nContext: {context}"
+
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
     async def chat(
         self,
         messages: list[dict],
@@ -166,69 +245,81 @@ class OpenRouterClient:
         if not self.is_available():
             raise ValueError("OpenRouter API key not configured")
 
-        payload = {
-            "model": self.model,
-            "messages": messages,
-        }
+        client = await self._get_client()
+        response = await client.post(
+            "/chat/completions",
+            headers={"Content-Type": "application/json"},
+            content=self._build_payload(messages, tools),
+        )
 
-        if tools:
-            payload["tools"] = tools
-            payload["tool_choice"] = "auto"
+        if response.status_code != 200:
+            logger.error(f"OpenRouter error: {response.status_code} - {response.text}")
+            raise Exception(f"OpenRouter API error: {response.status_code}")
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "HTTP-Referer": "https://opentrace.local",
-                    "X-Title": "OpenTrace",
-                },
-                json=payload,
-            )
+        return orjson.loads(response.content)
 
+    async def stream_chat(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Send a streaming chat request to OpenRouter.
+
+        Args:
+            messages: List of message objects with role and content
+            tools: Optional list of tool definitions
+
+        Yields:
+            Decoded server-sent event chunks (OpenAI delta format)
+        """
+        if not self.is_available():
+            raise ValueError("OpenRouter API key not configured")
+
+        client = await self._get_client()
+        async with client.stream(
+            "POST",
+            "/chat/completions",
+            headers={"Content-Type": "application/json"},
+            content=self._build_payload(messages, tools, stream=True),
+        ) as response:
             if response.status_code != 200:
+                await response.aread()
                 logger.error(f"OpenRouter error: {response.status_code} - {response.text}")
                 raise Exception(f"OpenRouter API error: {response.status_code}")
 
-            return response.json()
+            async for line in response.aiter_lines():
+                # Skip blank separators and ": keep-alive" comments
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                yield orjson.loads(data)
 
-    async def chat_with_tools(
+    async def stream_chat_with_tools(
         self,
         user_message: str,
         context: Optional[str] = None,
         conversation_history: Optional[list[dict]] = None
-    ) -> dict:
+    ) -> AsyncIterator[dict]:
         """
-        Send a chat request with tool support.
+        Send a streaming chat request with tool support.
 
         Args:
             user_message: The user's message
             context: Optional additional context
             conversation_history: Optional previous messages
 
-        Returns:
-            API response including any tool calls
+        Yields:
+            Decoded stream chunks, including partial tool calls
         """
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-        if conversation_history:
-            messages.extend(conversation_history)
-
-        if context:
-            user_message = f"{user_message}\n\nContext: {context}"
-
-        messages.append({"role": "user", "content": user_message})
-
-        return await self.chat(messages, tools=TOOLS)
-
-
-# Global client instance
-_client: Optional[OpenRouterClient] = None
+        messages = self._build_tool_messages(user_message, context, conversation_history)
+        async for chunk in self.stream_chat(messages, tools=TOOLS):
+            yield chunk
 
 
+@lru_cache
 def get_openrouter_client() -> OpenRouterClient:
     """Get the global OpenRouter client instance."""
-    global _client
-    if _client is None:
-        _client = OpenRouterClient()
-    return _client
+    return OpenRouterClient()
@@ -1,13 +1,17 @@
 """Agent planner for orchestrating LLM interactions and tool calls."""
 
-import json
+import asyncio
 import logging
+from functools import lru_cache
 from typing import Optional
 
+import orjson
+
 from .config import get_settings
 from .models import AgentResponse, Evidence, UIHints, ChatRequest
 from .openrouter import get_openrouter_client, TOOLS
-from .tools import get_tool_executor
+from .tools import get_tool_executor, READ_ONLY_TOOLS
+from .cache import ResultCache
 from .fallback import (
     analyze_query,
     analyze_trace_for_slowness,
@@ -20,6 +24,9 @@ from .fallback import (
 
 logger = logging.getLogger(__name__)
 
+# Part of the LLM cache key, so a changed tool set invalidates old entries
+_TOOL_NAMES = sorted(tool["function"]["name"] for tool in TOOLS)
+
 
 class AgentPlanner:
     """Orchestrates agent responses using LLM or fallback logic."""
@@ -28,6 +35,11 @@ class AgentPlanner:
         self.settings = get_settings()
         self.openrouter = get_openrouter_client()
         self.tool_executor = get_tool_executor()
+        self._tool_semaphore = asyncio.Semaphore(self.settings.tool_concurrency_limit)
+        self._llm_cache = ResultCache(
+            maxsize=self.settings.llm_cache_size,
+            ttl=self.settings.llm_cache_ttl
+        )
 
     async def process_message(self, request: ChatRequest) -> AgentResponse:
         """
@@ -42,70 +54,187 @@ class AgentPlanner:
             return await self._process_with_fallback(request)
 
     async def _process_with_llm(self, request: ChatRequest) -> AgentResponse:
-        """Process message using OpenRouter LLM."""
+        """
+        Process message using OpenRouter LLM.
+
+        The completion is streamed, and each read-only tool call is
+        dispatched as soon as its arguments have fully arrived, so tool I/O
+        overlaps with the rest of the model's output. Other calls wait for
+        the stream to complete.
+        """
+        # Partial tool calls by stream index: name, arguments, started task
+        pending: dict[int, dict] = {}
+        prefetch = None
+
         try:
             # Build context
             context = None
             if request.selected_trace_id:
                 context = f"Currently selected trace: {request.selected_trace_id}"
 
-            # Send to LLM
-            response = await self.openrouter.chat_with_tools(
+            # Replay a cached completion for an identical prompt
+            cache_key = ResultCache.make_key(
+                self.openrouter.model, request.message, context, _TOOL_NAMES
+            )
+            cached = self._llm_cache.get(cache_key) if self._llm_cache.ttl > 0 else None
+            if cached is not None:
+                return await self._respond_to_completion(
+                    cached["content"],
+                    [dict(call, task=None) for call in cached["tool_calls"]],
+                    request
+                )
+
+            # Warm the selected trace while the model decides what to call
+            if request.selected_trace_id:
+                prefetch = self.tool_executor.prefetch(
+                    "get_trace", {"trace_id": request.selected_trace_id}
+                )
+
+            # Stream from LLM
+            got_choice = False
+            content_parts: list[str] = []
+
+            async for chunk in self.openrouter.stream_chat_with_tools(
                 user_message=request.message,
                 context=context
-            )
+            ):
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                got_choice = True
+
+                delta = choices[0].get("delta") or {}
+                if delta.get("content"):
+                    content_parts.append(delta["content"])
+
+                for call_delta in delta.get("tool_calls") or []:
+                    index = call_delta.get("index", len(pending))
+                    call = pending.setdefault(
+                        index, {"name": "", "arguments": "", "task": None}
+                    )
+                    function = call_delta.get("function") or {}
+                    call["name"] += function.get("name") or ""
+                    call["arguments"] += function.get("arguments") or ""
+                    self._maybe_dispatch(call)
 
-            # Process response
-            choices = response.get("choices", [])
-            if not choices:
+            if not got_choice:
                 return AgentResponse(answer="No response from LLM.")
 
-            message = choices[0].get("message", {})
+            content = "".join(content_parts)
+            streamed = [pending[i] for i in sorted(pending)]
 
-            # Check for tool calls
-            tool_calls = message.get("tool_calls", [])
-            if tool_calls:
-                return await self._handle_tool_calls(tool_calls, request)
+            # Only cache completions whose tool calls are all read-only
+            if self._llm_cache.ttl > 0 and all(
+                call["name"] in READ_ONLY_TOOLS for call in streamed
+            ):
+                self._llm_cache.set(cache_key, {
+                    "content": content,
+                    "tool_calls": [
+                        {"name": call["name"], "arguments": call["arguments"]}
+                        for call in streamed
+                    ],
+                })
 
-            # Return text response
-            content = message.get("content", "")
-            return AgentResponse(
-                answer=content,
-                evidence=Evidence(traceId=request.selected_trace_id),
-                ui=UIHints()
-            )
+            return await self._respond_to_completion(content, streamed, request)
 
         except Exception as e:
             logger.error(f"LLM processing error: {e}")
             # Fall back to rule-based on error
             return await self._process_with_fallback(request)
 
-    async def _handle_tool_calls(
+        finally:
+            # Calls started mid-stream are awaited on success; on an error or
+            # cancellation nobody is left to await them
+            for call in pending.values():
+                if call["task"] and not call["task"].done():
+                    call["task"].cancel()
+            # Any call that wanted the prefetched trace has finished by now
+            if prefetch and not prefetch.done():
+                prefetch.cancel()
+
+    async def _respond_to_completion(
         self,
-        tool_calls: list[dict],
+        content: str,
+        streamed: list[dict],
         request: ChatRequest
     ) -> AgentResponse:
-        """Execute tool calls and return response."""
+        """Turn a completed LLM response into an agent response."""
+        # Check for tool calls
+        if streamed:
+            return await self._finish_streamed_tool_calls(streamed, request)
+
+        # Return text response
+        return AgentResponse(
+            answer=content,
+            evidence=Evidence(traceId=request.selected_trace_id),
+            ui=UIHints()
+        )
+
+    def _maybe_dispatch(self, call: dict) -> None:
+        """Start a streamed read-only tool call once its arguments are complete JSON."""
+        if call["task"] or not self.settings.parallel_tool_calls:
+            return
+
+        # A side-effecting call must not run before the stream is known to
+        # have succeeded, or the rule-based fallback could repeat it
+        if call["name"] not in READ_ONLY_TOOLS:
+            return
+
+        # Arguments are a JSON object, so only a closing brace can finish them
+        if not call["arguments"].rstrip().endswith("}"):
+            return
+
+        try:
+            args = orjson.loads(call["arguments"])
+        except orjson.JSONDecodeError:
+            return
+
+        if isinstance(args, dict):
+            call["task"] = asyncio.create_task(self._execute_tool(call["name"], args))
+
+    async def _finish_streamed_tool_calls(
+        self,
+        streamed: list[dict],
+        request: ChatRequest
+    ) -> AgentResponse:
+        """Wait for streamed tool calls, running any not yet started."""
+        if self.settings.parallel_tool_calls:
+            for call in streamed:
+                if not call["task"]:
+                    args = self._parse_arguments(call["arguments"])
+                    call["task"] = asyncio.create_task(self._execute_tool(call["name"], args))
+            outcomes = await asyncio.gather(*(call["task"] for call in streamed))
+        else:
+            outcomes = [
+                await self._execute_tool(call["name"], self._parse_arguments(call["arguments"]))
+                for call in streamed
+            ]
+
+        return self._build_tool_response([call["name"] for call in streamed], outcomes, request)
+
+    def _parse_arguments(self, args_str: Optional[str]) -> dict:
+        """Decode a tool call's JSON arguments, defaulting to no arguments."""
+        try:
+            return orjson.loads(args_str or "{}")
+        except orjson.JSONDecodeError:
+            return {}
+
+    def _build_tool_response(
+        self,
+        names: list[str],
+        outcomes: list[dict],
+        request: ChatRequest
+    ) -> AgentResponse:
+        """Build the agent response from tool results, in call order."""
         results = []
         highlight_nodes = []
         actions = []
 
-        for tool_call in tool_calls:
-            function = tool_call.get("function", {})
-            name = function.get("name", "")
-            args_str = function.get("arguments", "{}")
-
-            try:
-                args = json.loads(args_str)
-            except json.JSONDecodeError:
-                args = {}
-
-            # Execute the tool
-            result = await self.tool_executor.execute(name, args)
+        for name, result in zip(names, outcomes):
             results.append({"tool": name, "result": result})
 
-            # Check for action requests
-            if result.get("action_required"):
+            # Check for action requests (list_traces returns a bare list)
+            if isinstance(result, dict) and result.get("action_required"):
                 actions.append(result["action"])
 
             # Extract highlight hints from analysis results
@@ -128,6 +257,16 @@ class AgentPlanner:
             actions=actions
         )
 
+    async def _execute_tool(self, name: str, args: dict) -> dict:
+        """Execute a single tool, bounded by the tool concurrency limit."""
+        async with self._tool_semaphore:
+            try:
+                return await self.tool_executor.execute(name, args)
+            except Exception as e:
+                # Keep one failing tool from discarding the others' results
+                logger.error(f"Tool {name} failed: {e}")
+                return {"error": str(e)}
+
     def _summarize_tool_results(self, results: list[dict]) -> str:
         """Summarize tool execution results into a readable response."""
         summaries = []
@@ -136,7 +275,7 @@ class AgentPlanner:
             tool = result["tool"]
             data = result["result"]
 
-            if data.get("error"):
+            if isinstance(data, dict) and data.get("error"):
                 summaries.append(f"Error: {data['error']}")
                 continue
 
@@ -145,21 +284,21 @@ class AgentPlanner:
                 summaries.append(f"Found {count} recent traces.")
                 if isinstance(data, list) and data:
                     summaries.append("Recent traces:")
-                    for trace in data[:5]:
-                        summaries.append(
-                            f"- {trace.get('operationName', 'unknown')} "
-                            f"({trace.get('durationMs', 0):.1f}ms)"
-                        )
+                    summaries.extend(
+                        f"- {trace.get('operationName', 'unknown')} "
+                        f"({trace.get('durationMs', 0):.1f}ms)"
+                        for trace in data[:5]
+                    )
 
             elif tool == "get_trace_analysis":
                 summaries.append("**Trace Analysis:**")
                 if data.get("slowestSpans"):
                     summaries.append("\nSlowest operations:")
-                    for span in data["slowestSpans"][:3]:
-                        summaries.append(
-                            f"- {span.get('operationName', 'unknown')}: "
-                            f"{span.get('durationMs', 0):.1f}ms"
-                        )
+                    summaries.extend(
+                        f"- {span.get('operationName', 'unknown')}: "
+                        f"{span.get('durationMs', 0):.1f}ms"
+                        for span in data["slowestSpans"][:3]
+                    )
                 if data.get("errorSpans"):
                     summaries.append(f"\nFound {len(data['errorSpans'])} error(s)")
                 if data.get("criticalPath"):
@@ -191,7 +330,8 @@ class AgentPlanner:
         if intent == "list":
             # Fetch traces
             result = await self.tool_executor.execute("list_traces", {"limit": 10})
-            if result.get("error"):
+            # The search endpoint returns a bare list on success
+            if isinstance(result, dict) and result.get("error"):
                 return AgentResponse(
                     answer=f"Error fetching traces: {result['error']}",
                     evidence=Evidence(),
@@ -206,14 +346,17 @@ class AgentPlanner:
                     ui=UIHints()
                 )
 
-            answer = f"**Recent Traces ({len(traces)} found):**\n\n"
+            parts = [f"**Recent Traces ({len(traces)} found):**\n\n"]
             for trace in traces[:10]:
-                has_error = "ERROR" if trace.get("hasError") else "OK"
-                answer += (
-                    f"- `{trace.get('traceId', 'unknown')[:16]}...` | "
-                    f"{trace.get('operationName', 'unknown')} | "
-                    f"{trace.get('durationMs', 0):.1f}ms | {has_error}\n"
+                get = trace.get
+                trace_id = get("traceId", "unknown")[:16]
+                operation = get("operationName", "unknown")
+                duration_ms = get("durationMs", 0)
+                has_error = "ERROR" if get("hasError") else "OK"
+                parts.append(
+                    f"- `{trace_id}...` | {operation} | {duration_ms:.1f}ms | {has_error}\n"
                 )
+            answer = "".join(parts)
 
             return AgentResponse(
                 answer=answer,
@@ -249,13 +392,7 @@ class AgentPlanner:
             return unknown_intent_response()
 
 
-# Global planner instance
-_planner: Optional[AgentPlanner] = None
-
-
+@lru_cache
 def get_agent_planner() -> AgentPlanner:
     """Get the global agent planner instance."""
-    global _planner
-    if _planner is None:
-        _planner = AgentPlanner()
-    return _planner
+    return AgentPlanner()
@@ -0,0 +1 @@
+# Tests for OpenTrace Agent
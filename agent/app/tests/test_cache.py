@@ -0,0 +1,63 @@
+"""Tests for the TTL and LRU behavior of ResultCache."""
+
+import pytest
+
+from app import cache
+from app.cache import ResultCache
+
+
+class FakeClock:
+    """Stands in for the time module with a controllable monotonic clock."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+class TestResultCache:
+    def test_hit_within_ttl(self, clock):
+        results = ResultCache(maxsize=4, ttl=30.0)
+        results.set(b"a", {"value": 1})
+        clock.elapsed = 29.0
+
+        assert results.get(b"a") == {"value": 1}
+
+    def test_expired_entry_is_dropped(self, clock):
+        results = ResultCache(maxsize=4, ttl=30.0)
+        results.set(b"a", {"value": 1})
+        clock.elapsed = 31.0
+
+        assert results.get(b"a") is None
+        assert b"a" not in results._entries
+
+    def test_hits_are_independent_copies(self, clock):
+        results = ResultCache()
+        results.set(b"a", {"items": [1, 2]})
+
+        results.get(b"a")["items"].append(3)
+
+        assert results.get(b"a") == {"items": [1, 2]}
+
+    def test_evicts_least_recently_used(self, clock):
+        results = ResultCache(maxsize=2, ttl=30.0)
+        results.set(b"a", {"value": 1})
+        results.set(b"b", {"value": 2})
+        # Touch "a" so "b" is least recently used
+        results.get(b"a")
+        results.set(b"c", {"value": 3})
+
+        assert results.get(b"b") is None
+        assert results.get(b"a") == {"value": 1}
+        assert results.get(b"c") == {"value": 3}
+
+    def test_make_key_ignores_argument_order(self):
+        assert ResultCache.make_key("t", {"a": 1, "b": 2}) == ResultCache.make_key("t", {"b": 2, "a": 1})
@@ -0,0 +1,267 @@
+"""Tests for streamed LLM tool dispatch and completion caching in the agent planner."""
+
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from app.models import ChatRequest
+from app.openrouter import OpenRouterClient
+from app.planner import AgentPlanner
+from app.tools import ToolExecutor
+
+
+class FakeApi:
+    """Serves the OpenTrace API endpoints the tools call, logging each request."""
+
+    def __init__(self, events: list[str]):
+        self.events = events
+        self.requests: list[str] = []
+        # Set to make requests wait until released
+        self.gate: asyncio.Event | None = None
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        self.events.append(f"GET {path}")
+        if self.gate is not None:
+            try:
+                await self.gate.wait()
+            except asyncio.CancelledError:
+                self.events.append(f"cancelled {path}")
+                raise
+
+        if path == "/traces/search":
+            return httpx.Response(200, content=orjson.dumps([]))
+        if path.startswith("/traces/missing"):
+            return httpx.Response(404)
+        if path.endswith("/analysis"):
+            trace_id = path.split("/")[2]
+            return httpx.Response(200, content=orjson.dumps({
+                "criticalPath": [f"span:{trace_id}-root"],
+                "slowestSpans": [{"spanId": f"{trace_id}-root", "operationName": "GET /", "durationMs": 12.0}],
+            }))
+        if path.startswith("/flows/runtime/"):
+            return httpx.Response(200, content=orjson.dumps({"nodes": [{}, {}, {}]}))
+        trace_id = path.rsplit("/", 1)[-1]
+        return httpx.Response(200, content=orjson.dumps({"traceId": trace_id, "spans": []}))
+
+
+def make_executor(api: FakeApi) -> ToolExecutor:
+    executor = ToolExecutor()
+    executor._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(api.handler), base_url="http://api"
+    )
+    return executor
+
+
+def tool_delta(index: int, name: str = "", arguments: str = "") -> dict:
+    """One streamed chunk carrying part of a tool call."""
+    function = {"arguments": arguments}
+    if name:
+        function["name"] = name
+    return {"choices": [{"delta": {"tool_calls": [{"index": index, "function": function}]}}]}
+
+
+def content_delta(text: str) -> dict:
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+class FakeOpenRouter:
+    """Streams a scripted completion as server-sent events.
+
+    Each script item is a chunk to send or an async callable to run
+    between chunks, so tests can pause the stream mid-completion.
+    """
+
+    def __init__(self, events: list[str]):
+        self.events = events
+        self.script: list = []
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        return httpx.Response(200, content=self._body(list(self.script)))
+
+    async def _body(self, script: list):
+        for item in script:
+            if callable(item):
+                await item()
+            else:
+                yield b"data: " + orjson.dumps(item) + b"\n\n"
+        self.events.append("stream end")
+        yield b"data: [DONE]\n\n"
+
+
+async def pause():
+    """Give tasks started from earlier chunks a chance to run."""
+    await asyncio.sleep(0.05)
+
+
+async def fail():
+    raise RuntimeError("stream dropped")
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def api(events):
+    return FakeApi(events)
+
+
+@pytest.fixture
+def llm(events):
+    return FakeOpenRouter(events)
+
+
+@pytest.fixture
+def planner(api, llm):
+    planner = AgentPlanner()
+    openrouter = OpenRouterClient()
+    openrouter.api_key = "test-key"
+    openrouter._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(llm.handler), base_url="http://openrouter"
+    )
+    planner.openrouter = openrouter
+    planner.tool_executor = make_executor(api)
+    return planner
+
+
+class TestStreamedToolDispatch:
+    @pytest.mark.asyncio
+    async def test_read_only_call_starts_while_streaming(self, planner, llm, events):
+        llm.script = [
+            tool_delta(0, "get_trace_analysis", '{"trace_id": "t1"}'),
+            pause,
+            content_delta("Looking at the trace."),
+        ]
+
+        response = await planner.process_message(ChatRequest(message="why slow?"))
+
+        assert events == ["GET /traces/t1/analysis", "stream end"]
+        assert response.ui.highlight_nodes[0] == "span:t1-root"
+
+    @pytest.mark.asyncio
+    async def test_record_waits_for_stream_end(self, planner, llm, events, monkeypatch):
+        executor = planner.tool_executor
+        record = executor._handlers["record_request"]
+
+        async def logged_record(args):
+            events.append("record")
+            return await record(args)
+
+        monkeypatch.setitem(executor._handlers, "record_request", logged_record)
+        llm.script = [
+            tool_delta(0, "record_request", '{"path": "/demo/slow"}'),
+            pause,
+        ]
+
+        response = await planner.process_message(ChatRequest(message="record /demo/slow"))
+
+        assert events == ["stream end", "record"]
+        assert response.actions[0].params == {"path": "/demo/slow"}
+
+    @pytest.mark.asyncio
+    async def test_interleaved_calls_are_buffered_by_index(self, planner, llm, api):
+        llm.script = [
+            tool_delta(0, "get_runtime_flow", '{"trace'),
+            tool_delta(1, "get_trace_analysis", '{"trace_id"'),
+            tool_delta(0, arguments='_id": "t1"}'),
+            tool_delta(1, arguments=': "t2"}'),
+        ]
+
+        response = await planner.process_message(ChatRequest(message="show me"))
+
+        assert sorted(api.requests) == ["/flows/runtime/t1", "/traces/t2/analysis"]
+        # Results are reported in stream index order
+        assert response.answer.index("Graph loaded with 3 spans.") < response.answer.index("**Trace Analysis:**")
+
+    @pytest.mark.asyncio
+    async def test_stream_error_cancels_started_calls(self, planner, llm, api, events):
+        # list_traces is never cached, so it isn't shielded as a shared fetch
+        api.gate = asyncio.Event()
+        llm.script = [
+            tool_delta(0, "list_traces", '{"limit": 5}'),
+            pause,
+            fail,
+        ]
+
+        response = await planner.process_message(ChatRequest(message="hello"))
+        await asyncio.sleep(0)
+
+        assert "cancelled /traces/search" in events
+        # The rule-based fallback answered instead
+        assert response.answer
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_cancels_started_calls(self, planner, llm, api, events):
+        api.gate = asyncio.Event()
+        stalled = asyncio.Event()
+
+        async def stall():
+            stalled.set()
+            await asyncio.Event().wait()
+
+        llm.script = [
+            tool_delta(0, "list_traces", '{"limit": 5}'),
+            pause,
+            stall,
+        ]
+
+        task = asyncio.create_task(planner.process_message(ChatRequest(message="why slow?")))
+        await stalled.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+        assert "cancelled /traces/search" in events
+
+
+class TestLlmCache:
+    @pytest.mark.asyncio
+    async def test_identical_prompt_replays_cached_completion(self, planner, llm, api):
+        llm.script = [tool_delta(0, "get_trace_analysis", '{"trace_id": "t1"}')]
+        request = ChatRequest(message="why slow?", selectedTraceId="t1")
+
+        first = await planner.process_message(request)
+        second = await planner.process_message(request)
+
+        assert llm.calls == 1
+        assert second == first
+        # The replayed tool call hit the tool cache too
+        assert api.requests.count("/traces/t1/analysis") == 1
+
+    @pytest.mark.asyncio
+    async def test_different_context_is_not_replayed(self, planner, llm):
+        llm.script = [content_delta("Hi.")]
+
+        await planner.process_message(ChatRequest(message="hi", selectedTraceId="t1"))
+        await planner.process_message(ChatRequest(message="hi", selectedTraceId="t2"))
+
+        assert llm.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_completion_with_side_effecting_call_is_not_cached(self, planner, llm):
+        llm.script = [tool_delta(0, "record_request", '{"path": "/demo/slow"}')]
+        request = ChatRequest(message="record /demo/slow")
+
+        await planner.process_message(request)
+        second = await planner.process_message(request)
+
+        assert llm.calls == 2
+        assert second.actions[0].params == {"path": "/demo/slow"}
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_cache(self, planner, llm):
+        planner._llm_cache.ttl = 0
+        llm.script = [content_delta("Hi.")]
+
+        await planner.process_message(ChatRequest(message="hi"))
+        await planner.process_message(ChatRequest(message="hi"))
+
+        assert llm.calls == 2
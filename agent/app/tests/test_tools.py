@@ -0,0 +1,131 @@
+"""Tests for tool result caching and in-flight dedup in the tool executor."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.tests.test_planner import FakeApi, make_executor
+
+
+@pytest.fixture
+def api():
+    return FakeApi([])
+
+
+@pytest.fixture
+def executor(api):
+    return make_executor(api)
+
+
+class TestToolCache:
+    @pytest.mark.asyncio
+    async def test_repeat_call_is_served_from_cache(self, executor, api):
+        first = await executor.execute("get_trace", {"trace_id": "t1"})
+        second = await executor.execute("get_trace", {"trace_id": "t1"})
+
+        assert first == second == {"traceId": "t1", "spans": []}
+        assert api.requests == ["/traces/t1"]
+
+    @pytest.mark.asyncio
+    async def test_error_results_are_not_cached(self, executor, api):
+        first = await executor.execute("get_trace", {"trace_id": "missing"})
+        second = await executor.execute("get_trace", {"trace_id": "missing"})
+
+        assert first.get("error") and second.get("error")
+        assert api.requests == ["/traces/missing", "/traces/missing"]
+
+    @pytest.mark.asyncio
+    async def test_list_traces_is_never_cached(self, executor, api):
+        await executor.execute("list_traces", {"limit": 5})
+        await executor.execute("list_traces", {"limit": 5})
+
+        assert api.requests == ["/traces/search", "/traces/search"]
+
+    @pytest.mark.asyncio
+    async def test_clear_cache_forces_refetch(self, executor, api):
+        await executor.execute("get_trace", {"trace_id": "t1"})
+        executor.clear_cache()
+        await executor.execute("get_trace", {"trace_id": "t1"})
+
+        assert api.requests == ["/traces/t1", "/traces/t1"]
+
+    def test_record_action_clears_cache(self, executor, api, monkeypatch):
+        monkeypatch.setattr(main, "get_tool_executor", lambda: executor)
+        asyncio.run(executor.execute("get_trace", {"trace_id": "t1"}))
+        assert executor._cache._entries
+
+        def record(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"traceId": "new"})
+
+        with TestClient(main.app) as client:
+            main.app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(record))
+            response = client.post(
+                "/execute-action",
+                json={"actionType": "record", "params": {"path": "/demo/slow"}},
+            )
+
+        assert response.status_code == 200
+        assert not executor._cache._entries
+
+
+class TestInflightDedup:
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_request(self, executor, api):
+        api.gate = asyncio.Event()
+        calls = [
+            asyncio.create_task(executor.execute("get_trace_analysis", {"trace_id": "t1"}))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        api.gate.set()
+        results = await asyncio.gather(*calls)
+
+        assert api.requests == ["/traces/t1/analysis"]
+        assert results[0] == results[1] == results[2]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_request(self, executor, api):
+        api.gate = asyncio.Event()
+        first = asyncio.create_task(executor.execute("get_trace", {"trace_id": "t1"}))
+        second = asyncio.create_task(executor.execute("get_trace", {"trace_id": "t1"}))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        api.gate.set()
+
+        assert await second == {"traceId": "t1", "spans": []}
+        assert api.requests == ["/traces/t1"]
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_result_is_reused(self, executor, api):
+        await executor.prefetch("get_trace", {"trace_id": "t1"})
+        result = await executor.execute("get_trace", {"trace_id": "t1"})
+
+        assert result == {"traceId": "t1", "spans": []}
+        assert api.requests == ["/traces/t1"]
+
+    @pytest.mark.asyncio
+    async def test_prefetch_skips_uncacheable_tools(self, executor):
+        assert executor.prefetch("list_traces", {}) is None
+        assert executor.prefetch("record_request", {"path": "/"}) is None
+
+    @pytest.mark.asyncio
+    async def test_abandoned_prefetch_falls_back_to_direct_fetch(self, executor, api):
+        api.gate = asyncio.Event()
+        prefetch = executor.prefetch("get_trace", {"trace_id": "t1"})
+        joined = asyncio.create_task(executor.execute("get_trace", {"trace_id": "t1"}))
+        await asyncio.sleep(0.01)
+
+        prefetch.cancel()
+        await asyncio.sleep(0)
+        api.gate.set()
+
+        assert await joined == {"traceId": "t1", "spans": []}
+        assert api.requests == ["/traces/t1", "/traces/t1"]
+        assert "cancelled /traces/t1" in api.events
+        assert not executor._inflight
@@ -1,14 +1,37 @@
 """Tool execution for the agent."""
 
+import asyncio
 import httpx
+import orjson
 from typing import Any, Optional
 import logging
 
 from .config import get_settings
 from .models import ActionRequest
+from .cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
+# Serialized shape of a record action, filled in per call without re-validating
+_RECORD_ACTION_TEMPLATE = ActionRequest(
+    actionType="record",
+    description="",
+    params={},
+    requiresApproval=True
+).model_dump(by_alias=True)
+
+# Tools without side effects; record_request is never cached
+READ_ONLY_TOOLS = frozenset({
+    "list_traces",
+    "get_trace",
+    "get_trace_analysis",
+    "get_runtime_flow",
+})
+
+# Read-only tools whose results are cached. list_traces is left out so a
+# trace recorded moments ago always shows up in the next listing.
+CACHEABLE_TOOLS = READ_ONLY_TOOLS - {"list_traces"}
+
 
 class ToolExecutor:
     """Executes tools by calling the API service."""
@@ -16,6 +39,45 @@ class ToolExecutor:
     def __init__(self):
         self.settings = get_settings()
         self.api_url = self.settings.api_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache = ResultCache(
+            maxsize=self.settings.tool_cache_size,
+            ttl=self.settings.tool_cache_ttl
+        )
+        # Read-only calls currently running, so identical calls share one request
+        self._inflight: dict[bytes, asyncio.Task] = {}
+        self._handlers = {
+            "list_traces": self._list_traces,
+            "get_trace": self._get_trace,
+            "get_trace_analysis": self._get_trace_analysis,
+            "get_runtime_flow": self._get_runtime_flow,
+            "record_request": self._record_request,
+        }
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create HTTP client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                timeout=30.0,
+                # httpx only negotiates HTTP/2 over TLS (ALPN)
+                http2=self.api_url.startswith("https://"),
+                limits=httpx.Limits(
+                    max_keepalive_connections=32,
+                    max_connections=64,
+                    keepalive_expiry=30
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Close the HTTP client."""
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+
+    def clear_cache(self):
+        """Drop cached results, e.g. after a new trace was recorded."""
+        self._cache.clear()
 
     async def execute(self, tool_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
         """
@@ -28,19 +90,65 @@ class ToolExecutor:
         Returns:
             Tool execution result
         """
+        if tool_name not in CACHEABLE_TOOLS or self._cache.ttl <= 0:
+            return await self._dispatch(tool_name, arguments)
+
+        key = ResultCache.make_key(tool_name, arguments)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._start(key, tool_name, arguments)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            # Joined a prefetch that was abandoned; fetch directly instead
+            return await self._dispatch(tool_name, arguments)
+
+    def prefetch(self, tool_name: str, arguments: dict[str, Any]) -> Optional[asyncio.Task]:
+        """
+        Start a read-only tool call in the background.
+
+        A later identical execute() joins the running request or reads its
+        cached result. Returns None when the call can't be cached.
+        """
+        if tool_name not in CACHEABLE_TOOLS or self._cache.ttl <= 0:
+            return None
+
+        key = ResultCache.make_key(tool_name, arguments)
+        if self._cache.get(key) is not None:
+            return None
+        return self._start(key, tool_name, arguments)
+
+    def _start(self, key: bytes, tool_name: str, arguments: dict[str, Any]) -> asyncio.Task:
+        """Get the running task for a cacheable call, starting it if needed."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, tool_name, arguments))
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: bytes, tool_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        """Run a cacheable call and store its result."""
         try:
-            if tool_name == "list_traces":
-                return await self._list_traces(arguments)
-            elif tool_name == "get_trace":
-                return await self._get_trace(arguments)
-            elif tool_name == "get_trace_analysis":
-                return await self._get_trace_analysis(arguments)
-            elif tool_name == "get_runtime_flow":
-                return await self._get_runtime_flow(arguments)
-            elif tool_name == "record_request":
-                return await self._record_request(arguments)
-            else:
-                return {"error": f"Unknown tool: {tool_name}"}
+            result = await self._dispatch(tool_name, arguments)
+            # Don't cache failures; they may be transient
+            if not (isinstance(result, dict) and result.get("error")):
+                self._cache.set(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _dispatch(self, tool_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        """Route a tool call to its implementation."""
+        handler = self._handlers.get(tool_name)
+        if handler is None:
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        try:
+            return await handler(arguments)
         except Exception as e:
             logger.error(f"Tool execution error: {e}")
             return {"error": str(e)}
@@ -53,13 +161,13 @@ class ToolExecutor:
         if args.get("limit"):
             params["limit"] = args["limit"]
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.api_url}/traces/search",
-                params=params
-            )
-            response.raise_for_status()
-            return response.json()
+        client = await self._get_client()
+        response = await client.get(
+            "/traces/search",
+            params=params
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def _get_trace(self, args: dict) -> dict:
         """Get full trace data."""
@@ -67,12 +175,12 @@ class ToolExecutor:
         if not trace_id:
             return {"error": "trace_id is required"}
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.api_url}/traces/{trace_id}")
-            if response.status_code == 404:
-                return {"error": f"Trace {trace_id} not found"}
-            response.raise_for_status()
-            return response.json()
+        client = await self._get_client()
+        response = await client.get(f"/traces/{trace_id}")
+        if response.status_code == 404:
+            return {"error": f"Trace {trace_id} not found"}
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def _get_trace_analysis(self, args: dict) -> dict:
         """Get automated trace analysis."""
@@ -80,12 +188,12 @@ class ToolExecutor:
         if not trace_id:
             return {"error": "trace_id is required"}
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.api_url}/traces/{trace_id}/analysis")
-            if response.status_code == 404:
-                return {"error": f"Trace {trace_id} not found"}
-            response.raise_for_status()
-            return response.json()
+        client = await self._get_client()
+        response = await client.get(f"/traces/{trace_id}/analysis")
+        if response.status_code == 404:
+            return {"error": f"Trace {trace_id} not found"}
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def _get_runtime_flow(self, args: dict) -> dict:
         """Get ReactFlow graph for a trace."""
@@ -93,12 +201,12 @@ class ToolExecutor:
         if not trace_id:
             return {"error": "trace_id is required"}
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.api_url}/flows/runtime/{trace_id}")
-            if response.status_code == 404:
-                return {"error": f"Trace {trace_id} not found"}
-            response.raise_for_status()
-            return response.json()
+        client = await self._get_client()
+        response = await client.get(f"/flows/runtime/{trace_id}")
+        if response.status_code == 404:
+            return {"error": f"Trace {trace_id} not found"}
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
     async def _record_request(self, args: dict) -> dict:
         """
@@ -107,15 +215,11 @@ class ToolExecutor:
         Note: This returns an action request that requires approval,
         rather than executing directly.
         """
-        return {
-            "action_required": True,
-            "action": ActionRequest(
-                actionType="record",
-                description=f"Record {args.get('method', 'GET')} request to {args.get('path', '/')}",
-                params=args,
-                requiresApproval=self.settings.approval_required
-            ).model_dump(by_alias=True)
-        }
+        action = _RECORD_ACTION_TEMPLATE.copy()
+        action["description"] = f"Record {args.get('method', 'GET')} request to {args.get('path', '/')}"
+        action["params"] = args
+        action["requiresApproval"] = self.settings.approval_required
+        return {"action_required": True, "action": action}
 
 
 # Global executor instance
@@ -1,7 +1,8 @@
 """Configuration settings for the API service."""
 
+import re
 from pydantic_settings import BaseSettings
-from functools import lru_cache
+from functools import cached_property, lru_cache
 
 
 class Settings(BaseSettings):
@@ -10,6 +11,13 @@ class Settings(BaseSettings):
     # Jaeger configuration
     jaeger_query_url: str = "http://jaeger:16686"
 
+    # Fetched traces reused without refetching for this many seconds. Only
+    # traces whose newest span ended at least trace_settle_seconds ago are
+    # cached, since a very recent trace may still be receiving spans
+    trace_cache_ttl: float = 30.0
+    trace_cache_size: int = 256
+    trace_settle_seconds: float = 60.0
+
     # OpenTelemetry configuration
     otel_exporter_otlp_endpoint: str = "http://jaeger:4317"
     otel_service_name: str = "opentrace-api"
@@ -27,6 +35,22 @@ class Settings(BaseSettings):
     # Repo analysis
     repos_base_path: str = "/tmp/repos"
 
+    # OpenRouter configuration for LLM repo analysis
+    openrouter_api_key: str = ""
+    openrouter_model: str = "minimax/minimax-m2.1"
+
+    # LLM analyses cached on disk, keyed by repo content (0 disables)
+    analysis_cache_path: str = "/tmp/repos/analysis_cache.db"
+    analysis_cache_ttl: int = 7 * 24 * 3600
+
+    @cached_property
+    def combined_allowlist(self) -> re.Pattern:
+        """All allowlist patterns fused into one precompiled alternation."""
+        if not self.record_allowlist:
+            # An empty alternation would match everything
+            return re.compile(r"(?!)")
+        return re.compile("|".join(f"(?:{p})" for p in self.record_allowlist))
+
     class Config:
         env_file = ".env"
 
@@ -11,6 +11,12 @@ router = APIRouter(prefix="/demo", tags=["demo"])
 # Get tracer for manual spans
 tracer = trace.get_tracer(__name__)
 
+# Simulated delay ranges in seconds, as base + spread * random()
+_SLOW_BASE, _SLOW_SPREAD = 0.3, 0.5
+_DB_BASE, _DB_SPREAD = 0.01, 0.09
+_WORKER_SPREAD = 0.1
+_MIXED_DB_BASE, _MIXED_DB_SPREAD = 0.02, 0.06
+
 
 @router.get("/fast")
 async def demo_fast():
@@ -27,7 +33,7 @@ async def demo_slow():
     """A slow endpoint that simulates processing delay."""
     # Create a custom span for the "processing" work
     with tracer.start_as_current_span("slow-processing") as span:
-        delay = random.uniform(0.3, 0.8)
+        delay = _SLOW_BASE + _SLOW_SPREAD * random.random()
         span.set_attribute("delay_seconds", delay)
         await asyncio.sleep(delay)
 
@@ -66,8 +72,7 @@ async def demo_external():
                 "message": "Simulated external call (no internet)"
             }
         except Exception as e:
-            span.set_attribute("external.error", str(e))
-            span.set_attribute("external.simulated", True)
+            span.set_attributes({"external.error": str(e), "external.simulated": True})
             await asyncio.sleep(0.1)
             return {
                 "status": "ok",
@@ -81,8 +86,10 @@ async def demo_external():
 async def demo_error():
     """An endpoint that always returns a 500 error."""
     with tracer.start_as_current_span("error-operation") as span:
-        span.set_attribute("error.intentional", True)
-        span.set_attribute("error.type", "demo_error")
+        span.set_attributes({
+            "error.intentional": True,
+            "error.type": "demo_error",
+        })
 
     raise HTTPException(
         status_code=500,
@@ -94,12 +101,14 @@ async def demo_error():
 async def demo_db():
     """Simulates a database operation."""
     with tracer.start_as_current_span("db-query") as span:
-        span.set_attribute("db.system", "postgresql")
-        span.set_attribute("db.operation", "SELECT")
-        span.set_attribute("db.statement", "SELECT * FROM users LIMIT 100")
+        span.set_attributes({
+            "db.system": "postgresql",
+            "db.operation": "SELECT",
+            "db.statement": "SELECT * FROM users LIMIT 100",
+        })
 
         # Simulate query time
-        query_time = random.uniform(0.01, 0.1)
+        query_time = _DB_BASE + _DB_SPREAD * random.random()
         await asyncio.sleep(query_time)
 
         span.set_attribute("db.rows_affected", 42)
@@ -151,8 +160,7 @@ async def demo_parallel():
     """
     async def worker(name: str, delay: float) -> dict:
         with tracer.start_as_current_span(f"parallel-worker-{name}") as span:
-            span.set_attribute("worker.name", name)
-            span.set_attribute("worker.delay", delay)
+            span.set_attributes({"worker.name": name, "worker.delay": delay})
             await asyncio.sleep(delay)
             return {"name": name, "delay_ms": int(delay * 1000)}
 
@@ -160,11 +168,13 @@ async def demo_parallel():
         span.set_attribute("worker_count", 3)
 
         # Run workers in parallel
-        results = await asyncio.gather(
-            worker("alpha", random.uniform(0.1, 0.2)),
-            worker("beta", random.uniform(0.15, 0.25)),
-            worker("gamma", random.uniform(0.05, 0.15)),
-        )
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(worker("alpha", 0.1 + _WORKER_SPREAD * random.random())),
+                tg.create_task(worker("beta", 0.15 + _WORKER_SPREAD * random.random())),
+                tg.create_task(worker("gamma", 0.05 + _WORKER_SPREAD * random.random())),
+            ]
+        results = [task.result() for task in tasks]
 
     return {
         "status": "ok",
@@ -187,16 +197,14 @@ async def demo_mixed():
         await asyncio.sleep(0.01)
 
     with tracer.start_as_current_span("db-lookup") as span:
-        span.set_attribute("db.system", "postgresql")
-        span.set_attribute("db.operation", "SELECT")
-        db_time = random.uniform(0.02, 0.08)
+        span.set_attributes({"db.system": "postgresql", "db.operation": "SELECT"})
+        db_time = _MIXED_DB_BASE + _MIXED_DB_SPREAD * random.random()
         await asyncio.sleep(db_time)
         span.set_attribute("db.rows_affected", 1)
 
     with tracer.start_as_current_span("enrich-from-cache") as span:
-        span.set_attribute("cache.system", "redis")
-        cache_hit = random.choice([True, False])
-        span.set_attribute("cache.hit", cache_hit)
+        cache_hit = random.random() < 0.5
+        span.set_attributes({"cache.system": "redis", "cache.hit": cache_hit})
         await asyncio.sleep(0.005 if cache_hit else 0.02)
 
     with tracer.start_as_current_span("format-response") as span:
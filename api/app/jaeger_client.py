@@ -1,6 +1,9 @@
 """Client for interacting with Jaeger Query API."""
 
 import httpx
+import orjson
+import time
+from collections import OrderedDict
 from typing import Optional
 from .config import get_settings
 
@@ -12,13 +15,22 @@ class JaegerClient:
         settings = get_settings()
         self.base_url = base_url or settings.jaeger_query_url
         self._client: Optional[httpx.AsyncClient] = None
+        # trace_id -> (fetched_at, encoded trace), least recent first. Traces are
+        # kept encoded so every hit decodes a copy the caller may modify.
+        self._trace_cache: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._trace_cache_ttl = settings.trace_cache_ttl
+        self._trace_cache_size = settings.trace_cache_size
+        self._trace_settle_us = settings.trace_settle_seconds * 1_000_000
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
         if self._client is None or self._client.is_closed:
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
-                timeout=30.0
+                timeout=30.0,
+                # httpx only negotiates HTTP/2 over TLS (ALPN)
+                http2=self.base_url.startswith("https://"),
+                limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60)
             )
         return self._client
 
@@ -41,7 +53,7 @@ class JaegerClient:
         client = await self._get_client()
         response = await client.get("/api/services")
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data.get("data", [])
 
     async def get_operations(self, service: str) -> list[str]:
@@ -49,7 +61,7 @@ class JaegerClient:
         client = await self._get_client()
         response = await client.get(f"/api/services/{service}/operations")
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data.get("data", [])
 
     async def search_traces(
@@ -144,7 +156,7 @@ class JaegerClient:
 
         response = await client.get("/api/traces", params=params)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data.get("data", [])
 
     async def get_trace(self, trace_id: str) -> Optional[dict]:
@@ -155,21 +167,49 @@ class JaegerClient:
             trace_id: The trace ID (32 hex characters)
 
         Returns:
-            Trace data dictionary or None if not found
+            Trace data dictionary or None if not found. Each call returns
+            its own copy.
         """
-        client = await self._get_client()
+        cached = self._trace_cache.get(trace_id)
+        if cached:
+            fetched_at, encoded = cached
+            if time.monotonic() - fetched_at < self._trace_cache_ttl:
+                self._trace_cache.move_to_end(trace_id)
+                return orjson.loads(encoded)
+            del self._trace_cache[trace_id]
 
+        client = await self._get_client()
         try:
             response = await client.get(f"/api/traces/{trace_id}")
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             traces = data.get("data", [])
-            return traces[0] if traces else None
+            trace = traces[0] if traces else None
+
+            if trace and self._trace_cache_size > 0 and self._is_settled(trace):
+                self._store_trace(trace_id, trace)
+            return trace
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 return None
             raise
 
+    def _is_settled(self, trace: dict) -> bool:
+        """Check whether a trace's newest span ended long enough ago to be complete."""
+        spans = trace.get("spans", [])
+        if not spans:
+            return False
+        # Span times are microseconds since the epoch
+        last_end = max(s.get("startTime", 0) + s.get("duration", 0) for s in spans)
+        return time.time() * 1_000_000 - last_end >= self._trace_settle_us
+
+    def _store_trace(self, trace_id: str, trace: dict):
+        """Cache a fetched trace, evicting the least recently used if full."""
+        self._trace_cache[trace_id] = (time.monotonic(), orjson.dumps(trace))
+        self._trace_cache.move_to_end(trace_id)
+        if len(self._trace_cache) > self._trace_cache_size:
+            self._trace_cache.popitem(last=False)
+
     async def get_trace_raw(self, trace_id: str) -> Optional[dict]:
         """Get raw trace data as returned by Jaeger."""
         return await self.get_trace(trace_id)
@@ -1,8 +1,11 @@
 """Main FastAPI application for OpenTrace API service."""
 
+import asyncio
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from opentelemetry import trace
 from typing import Optional
 
@@ -10,31 +13,42 @@ from .config import get_settings
 from .models import (
     FlowGraph, TraceSummary, TraceSearchParams,
     RecordRequest, RecordResponse, HealthResponse,
-    AnalyzeRepoRequest, RepoInfo
+    AnalyzeRepoRequest, RepoInfo, RepoLanguage
 )
 from .jaeger_client import get_jaeger_client, JaegerClient
-from .trace_to_graph import trace_to_reactflow, find_critical_path, find_slowest_spans, find_error_spans
+from .trace_to_graph import (
+    trace_to_reactflow, build_trace_index, find_critical_path, find_slowest_spans, find_error_spans
+)
 from .static_graph import openapi_to_static_graph
-from .record import record_request
+from .record import record_request, close_record_client
 from .demo.routes import router as demo_router
-from .repo_analyzer import get_repo_manager
+from .repo_analyzer import NoFreePortError, get_repo_manager
+from .repo_analyzer.agent_analyzer import close_agent_client
+from .repo_analyzer.runner import close_container_runner
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
+    jaeger = get_jaeger_client()
+    # Open the Jaeger connection in the background so startup isn't blocked
+    warmup = asyncio.create_task(jaeger.health_check())
     yield
     # Shutdown
-    jaeger = get_jaeger_client()
+    warmup.cancel()
     await jaeger.close()
+    await close_record_client()
+    await close_agent_client()
+    await close_container_runner()
 
 
 app = FastAPI(
     title="OpenTrace API",
     description="Live App Flow Investigator - Visualize application traces",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend
@@ -53,13 +67,10 @@ app.add_middleware(
 async def add_trace_id_header(request, call_next):
     response = await call_next(request)
 
-    # Get current trace context
-    span = trace.get_current_span()
-    if span:
-        ctx = span.get_span_context()
-        if ctx.is_valid:
-            trace_id = format(ctx.trace_id, '032x')
-            response.headers["x-trace-id"] = trace_id
+    # Get current trace context; the no-op span's context is never valid
+    ctx = trace.get_current_span().get_span_context()
+    if ctx.is_valid:
+        response.headers["x-trace-id"] = f"{ctx.trace_id:032x}"
 
     return response
 
@@ -102,7 +113,44 @@ async def get_runtime_flow(trace_id: str):
             detail=f"Trace {trace_id} not found. It may not have been recorded yet or has expired."
         )
 
-    return trace_to_reactflow(trace_data)
+    # Returning a response directly skips re-validating the graph against FlowGraph
+    graph = trace_to_reactflow(trace_data)
+    return Response(content=graph.to_json_bytes(), media_type="application/json")
+
+
+# Upper bound on trace IDs per batch request, to bound Jaeger fan-out
+MAX_BATCH_TRACES = 10
+
+
+@app.get("/flows/runtime", response_model=list[FlowGraph])
+async def get_runtime_flows(
+    ids: str = Query(..., description="Comma-separated trace IDs (at most 10)")
+):
+    """
+    Get ReactFlow graphs for several traces in one request.
+
+    Traces are fetched from Jaeger concurrently. IDs that are not found
+    are skipped; graphs are returned in request order.
+    """
+    trace_ids = [i for i in (part.strip() for part in ids.split(",")) if i]
+    if not trace_ids:
+        raise HTTPException(status_code=400, detail="No trace IDs given")
+    if len(trace_ids) > MAX_BATCH_TRACES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_TRACES} trace IDs per request"
+        )
+
+    jaeger = get_jaeger_client()
+    results = await asyncio.gather(*(jaeger.get_trace(i) for i in trace_ids))
+
+    # Each graph is encoded straight to JSON; only the list brackets are joined here
+    body = b",".join(
+        trace_to_reactflow(trace_data).to_json_bytes()
+        for trace_data in results
+        if trace_data
+    )
+    return Response(content=b"[" + body + b"]", media_type="application/json")
 
 
 @app.get("/flows/static", response_model=FlowGraph)
@@ -112,7 +160,13 @@ async def get_static_flow():
 
     Returns a graph showing all API routes grouped by their path prefix.
     """
-    return openapi_to_static_graph(app)
+    return Response(content=_static_graph_json(), media_type="application/json")
+
+
+@lru_cache(maxsize=1)
+def _static_graph_json() -> bytes:
+    """Encoded static graph; routes don't change once the app is serving."""
+    return openapi_to_static_graph(app).to_json_bytes()
 
 
 # === Trace Endpoints ===
@@ -154,13 +208,32 @@ async def search_traces(
 
         processes = trace_data.get("processes", {})
 
-        # Find root span (usually the first one with no parent)
+        # One pass over the spans: root span, error flag and time bounds
         root_span = None
+        has_error = False
+        min_start = spans[0].get("startTime", 0)
+        max_end = min_start + spans[0].get("duration", 0)
         for span in spans:
-            refs = span.get("references", [])
-            if not any(r.get("refType") == "CHILD_OF" for r in refs):
-                root_span = span
-                break
+            start = span.get("startTime", 0)
+            end = start + span.get("duration", 0)
+            if start < min_start:
+                min_start = start
+            if end > max_end:
+                max_end = end
+
+            # Root span is usually the first one with no parent
+            if root_span is None:
+                for r in span.get("references", []):
+                    if r.get("refType") == "CHILD_OF":
+                        break
+                else:
+                    root_span = span
+
+            if not has_error:
+                for t in span.get("tags", []):
+                    if t.get("key") == "error" and t.get("value") == True:
+                        has_error = True
+                        break
 
         if not root_span:
             root_span = spans[0]
@@ -170,32 +243,21 @@ async def search_traces(
         process = processes.get(process_id, {})
         service_name = process.get("serviceName", "unknown")
 
-        # Check for errors
-        has_error = any(
-            any(t.get("key") == "error" and t.get("value") == True
-                for t in s.get("tags", []))
-            for s in spans
-        )
+        # Total duration
+        duration_ms = (max_end - min_start) / 1000
 
-        # Calculate total duration
-        if spans:
-            min_start = min(s.get("startTime", 0) for s in spans)
-            max_end = max(s.get("startTime", 0) + s.get("duration", 0) for s in spans)
-            duration_ms = (max_end - min_start) / 1000
-        else:
-            duration_ms = 0
+        # Built with TraceSummary's aliases directly; the model documents the shape
+        summaries.append({
+            "traceId": trace_data.get("traceID", ""),
+            "serviceName": service_name,
+            "operationName": root_span.get("operationName", "unknown"),
+            "durationMs": duration_ms,
+            "spanCount": len(spans),
+            "timestamp": root_span.get("startTime", 0),
+            "hasError": has_error
+        })
 
-        summaries.append(TraceSummary(
-            traceId=trace_data.get("traceID", ""),
-            serviceName=service_name,
-            operationName=root_span.get("operationName", "unknown"),
-            durationMs=duration_ms,
-            spanCount=len(spans),
-            timestamp=root_span.get("startTime", 0),
-            hasError=has_error
-        ))
-
-    return summaries
+    return ORJSONResponse(summaries)
 
 
 @app.get("/traces/{trace_id}")
@@ -214,7 +276,8 @@ async def get_trace(trace_id: str):
             detail=f"Trace {trace_id} not found"
         )
 
-    return trace_data
+    # Raw Jaeger JSON can be large; skip the jsonable_encoder walk
+    return ORJSONResponse(trace_data)
 
 
 @app.get("/traces/{trace_id}/analysis")
@@ -231,11 +294,12 @@ async def analyze_trace(trace_id: str):
             detail=f"Trace {trace_id} not found"
         )
 
-    critical_path = find_critical_path(trace_data)
-    slowest = find_slowest_spans(trace_data, n=5)
-    errors = find_error_spans(trace_data)
+    index = build_trace_index(trace_data)
+    critical_path = find_critical_path(trace_data, index)
+    slowest = find_slowest_spans(trace_data, n=5, index=index)
+    errors = find_error_spans(trace_data, index)
 
-    return {
+    return ORJSONResponse({
         "traceId": trace_id,
         "criticalPath": [f"span:{sid}" for sid in critical_path],
         "slowestSpans": [
@@ -253,7 +317,7 @@ async def analyze_trace(trace_id: str):
             }
             for s in errors
         ]
-    }
+    })
 
 
 # === Services Endpoints ===
@@ -299,7 +363,6 @@ async def record_trace(request: RecordRequest):
             )
         
         # Try container name first (if on same Docker network), then fallback
-        from .models import RepoLanguage
         container_name = f"opentrace-{repo.repo_id}"
         internal_port = 8000 if repo.language == RepoLanguage.PYTHON else 3000
         
@@ -328,18 +391,17 @@ async def analyze_repo(request: AnalyzeRepoRequest):
 
     Clones the repo, detects language and framework, finds entry point.
     """
-    from .repo_analyzer import get_repo_manager
-
     repo_manager = get_repo_manager()
-    repo_info = await repo_manager.analyze(request.github_url, request.branch)
+    try:
+        repo_info = await repo_manager.analyze(request.github_url, request.branch)
+    except NoFreePortError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return repo_info
 
 
 @app.get("/repos/{repo_id}", response_model=RepoInfo)
 async def get_repo_status(repo_id: str):
     """Get the current status of a repository analysis/run."""
-    from .repo_analyzer import get_repo_manager
-
     repo_manager = get_repo_manager()
     repo = repo_manager.get_repo(repo_id)
 
@@ -355,8 +417,6 @@ async def get_repo_status(repo_id: str):
 @app.post("/repos/{repo_id}/start", response_model=RepoInfo)
 async def start_repo(repo_id: str):
     """Build and start the repository container."""
-    from .repo_analyzer import get_repo_manager
-
     repo_manager = get_repo_manager()
     repo = await repo_manager.start(repo_id)
 
@@ -372,8 +432,6 @@ async def start_repo(repo_id: str):
 @app.post("/repos/{repo_id}/stop", response_model=RepoInfo)
 async def stop_repo(repo_id: str):
     """Stop the running repository container."""
-    from .repo_analyzer import get_repo_manager
-
     repo_manager = get_repo_manager()
     repo = await repo_manager.stop(repo_id)
 
@@ -389,8 +447,6 @@ async def stop_repo(repo_id: str):
 @app.get("/repos")
 async def list_repos():
     """List all analyzed repositories."""
-    from .repo_analyzer import get_repo_manager
-
     repo_manager = get_repo_manager()
     repos = repo_manager.list_repos()
     return {"repos": repos}
@@ -1,6 +1,7 @@
 """Pydantic models for API request/response schemas."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
 from typing import Optional, Any
 from enum import Enum
 
@@ -9,16 +10,16 @@ from enum import Enum
 
 class NodeData(BaseModel):
     """Data attached to a ReactFlow node."""
-    span_id: str = Field(..., alias="spanId")
-    operation_name: str = Field(..., alias="operationName")
-    service_name: str = Field(..., alias="serviceName")
+    span_id: str
+    operation_name: str
+    service_name: str
+    # Not camelCase of the field name, so the alias stays explicit
     duration_ms: float = Field(..., alias="duration")
-    start_time: int = Field(..., alias="startTime")
+    start_time: int
     status: str = "success"
     tags: dict[str, Any] = {}
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class FlowNode(BaseModel):
@@ -32,10 +33,9 @@ class FlowNode(BaseModel):
 class EdgeData(BaseModel):
     """Data attached to a ReactFlow edge."""
     type: str = "childOf"
-    latency_ms: Optional[float] = Field(None, alias="latencyMs")
+    latency_ms: Optional[float] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class FlowEdge(BaseModel):
@@ -43,20 +43,19 @@ class FlowEdge(BaseModel):
     id: str
     source: str
     target: str
-    data: EdgeData = EdgeData(type="childOf")
+    data: EdgeData = Field(default_factory=lambda: EdgeData(type="childOf"))
     animated: bool = False
 
 
 class FlowMeta(BaseModel):
     """Metadata about the flow graph."""
-    trace_id: Optional[str] = Field(None, alias="traceId")
-    total_duration_ms: Optional[float] = Field(None, alias="totalDurationMs")
-    span_count: int = Field(0, alias="spanCount")
-    service_count: int = Field(0, alias="serviceCount")
+    trace_id: Optional[str] = None
+    total_duration_ms: Optional[float] = None
+    span_count: int = 0
+    service_count: int = 0
     version: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class FlowGraph(BaseModel):
@@ -65,6 +64,10 @@ class FlowGraph(BaseModel):
     edges: list[FlowEdge]
     meta: FlowMeta
 
+    def to_json_bytes(self) -> bytes:
+        """Encode in wire form (camelCase), serialized directly by pydantic-core."""
+        return self.model_dump_json(by_alias=True).encode()
+
 
 # === Trace Models ===
 
@@ -74,26 +77,24 @@ class TraceSearchParams(BaseModel):
     operation: Optional[str] = None
     tags: Optional[dict[str, str]] = None
     lookback: str = "1h"
-    min_duration_ms: Optional[int] = Field(None, alias="minDurationMs")
-    max_duration_ms: Optional[int] = Field(None, alias="maxDurationMs")
+    min_duration_ms: Optional[int] = None
+    max_duration_ms: Optional[int] = None
     limit: int = 20
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class TraceSummary(BaseModel):
     """Summary of a trace for listing."""
-    trace_id: str = Field(..., alias="traceId")
-    service_name: str = Field(..., alias="serviceName")
-    operation_name: str = Field(..., alias="operationName")
-    duration_ms: float = Field(..., alias="durationMs")
-    span_count: int = Field(..., alias="spanCount")
+    trace_id: str
+    service_name: str
+    operation_name: str
+    duration_ms: float
+    span_count: int
     timestamp: int
-    has_error: bool = Field(False, alias="hasError")
+    has_error: bool = False
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 # === Record Models ===
@@ -104,21 +105,19 @@ class RecordRequest(BaseModel):
     path: str
     body: Optional[dict[str, Any]] = None
     headers: Optional[dict[str, str]] = None
-    repo_id: Optional[str] = Field(None, alias="repoId")
+    repo_id: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class RecordResponse(BaseModel):
     """Response from recording a trace."""
     status: int
-    trace_id: Optional[str] = Field(None, alias="traceId")
-    response_body: Optional[Any] = Field(None, alias="responseBody")
+    trace_id: Optional[str] = None
+    response_body: Optional[Any] = None
     error: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 # === Repo Analysis Models ===
@@ -153,28 +152,26 @@ class RepoStatus(str, Enum):
 
 class AnalyzeRepoRequest(BaseModel):
     """Request to analyze a GitHub repository."""
-    github_url: str = Field(..., alias="githubUrl")
+    github_url: str
     branch: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 class RepoInfo(BaseModel):
     """Information about an analyzed repository."""
-    repo_id: str = Field(..., alias="repoId")
-    github_url: str = Field(..., alias="githubUrl")
+    repo_id: str
+    github_url: str
     status: RepoStatus
     language: Optional[RepoLanguage] = None
     framework: Optional[RepoFramework] = None
     entrypoint: Optional[str] = None
     port: int = 8000
     endpoints: list[str] = []
-    container_id: Optional[str] = Field(None, alias="containerId")
-    error_message: Optional[str] = Field(None, alias="errorMessage")
+    container_id: Optional[str] = None
+    error_message: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
 # === Health Models ===
@@ -183,7 +180,6 @@ class HealthResponse(BaseModel):
     """Health check response."""
     status: str = "healthy"
     service: str = "opentrace-api"
-    jaeger_connected: bool = Field(False, alias="jaegerConnected")
+    jaeger_connected: bool = False
 
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
@@ -1,20 +1,41 @@
 """Record requests to target applications and capture traces."""
 
-import re
 import httpx
+import orjson
 from typing import Optional
 from opentelemetry import trace
 from .config import get_settings
 from .models import RecordRequest, RecordResponse
 
 
+# HTTP methods that can be recorded, and those that send the request body
+ALLOWED_METHODS = frozenset({"GET", "POST", "PUT", "DELETE", "PATCH"})
+BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# Shared client, so repeated recordings reuse pooled keep-alive connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the recording HTTP client."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+        )
+    return _client
+
+
+async def close_record_client():
+    """Close the recording HTTP client."""
+    if _client and not _client.is_closed:
+        await _client.aclose()
+
+
 def is_path_allowed(path: str) -> bool:
     """Check if a path is in the allowlist for recording."""
-    settings = get_settings()
-    for pattern in settings.record_allowlist:
-        if re.match(pattern, path):
-            return True
-    return False
+    return get_settings().combined_allowlist.match(path) is not None
 
 
 async def record_request(
@@ -45,58 +66,52 @@ async def record_request(
     # Build the full URL
     url = f"{target_base_url.rstrip('/')}{request.path}"
 
-    # Prepare headers - include any custom headers from request
-    headers = dict(request.headers or {})
+    # Pass any custom headers straight through; httpx copies them itself
+    headers = request.headers or None
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            if request.method.upper() == "GET":
-                response = await client.get(url, headers=headers)
-            elif request.method.upper() == "POST":
-                response = await client.post(
-                    url,
-                    headers=headers,
-                    json=request.body
-                )
-            elif request.method.upper() == "PUT":
-                response = await client.put(
-                    url,
-                    headers=headers,
-                    json=request.body
-                )
-            elif request.method.upper() == "DELETE":
-                response = await client.delete(url, headers=headers)
-            else:
-                return RecordResponse(
-                    status=400,
-                    error=f"Unsupported HTTP method: {request.method}"
-                )
-
-            # Extract trace ID from response headers
-            # OpenTelemetry uses 'traceparent' header in W3C format:
-            # traceparent: 00-{trace_id}-{span_id}-{flags}
-            trace_id = None
-            traceparent = response.headers.get("traceparent")
-            if traceparent:
-                parts = traceparent.split("-")
-                if len(parts) >= 2:
-                    trace_id = parts[1]
-
-            # Also check for x-trace-id header (custom header we'll add)
-            if not trace_id:
-                trace_id = response.headers.get("x-trace-id")
-
-            # Try to parse response body
+        method = request.method.upper()
+        if method not in ALLOWED_METHODS:
+            return RecordResponse(
+                status=400,
+                error=f"Unsupported HTTP method: {request.method}"
+            )
+
+        client = _get_client()
+        response = await client.request(
+            method,
+            url,
+            headers=headers,
+            json=request.body if method in BODY_METHODS else None
+        )
+
+        # Extract trace ID from response headers
+        # OpenTelemetry uses 'traceparent' header in W3C format:
+        # traceparent: 00-{trace_id}-{span_id}-{flags}
+        trace_id = None
+        traceparent = response.headers.get("traceparent")
+        if traceparent and len(traceparent) >= 35 and traceparent[2] == "-":
+            # Fixed offsets: 2-char version, dash, 32-hex trace ID
+            trace_id = traceparent[3:35]
+
+        # Also check for x-trace-id header (custom header we'll add)
+        if not trace_id:
+            trace_id = response.headers.get("x-trace-id")
+
+        # Parse JSON bodies; anything else (or malformed JSON) stays text
+        if "json" in response.headers.get("content-type", ""):
             try:
-                response_body = response.json()
-            except Exception:
+                response_body = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
                 response_body = response.text
+        else:
+            response_body = response.text
 
-            return RecordResponse(
-                status=response.status_code,
-                traceId=trace_id,
-                responseBody=response_body
-            )
+        return RecordResponse(
+            status=response.status_code,
+            traceId=trace_id,
+            responseBody=response_body
+        )
 
     except httpx.ConnectError as e:
         return RecordResponse(
@@ -1,6 +1,6 @@
 """Repository analyzer package for cloning and instrumenting external repos."""
 
 from .analyzer import RepoAnalyzer
-from .manager import RepoManager, get_repo_manager
+from .manager import NoFreePortError, RepoManager, get_repo_manager
 
-__all__ = ["RepoAnalyzer", "RepoManager", "get_repo_manager"]
+__all__ = ["NoFreePortError", "RepoAnalyzer", "RepoManager", "get_repo_manager"]
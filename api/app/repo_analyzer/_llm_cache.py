@@ -0,0 +1,71 @@
+"""SQLite-backed cache of LLM repository analyses."""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """Persistent key/value store for serialized analyses with expiry."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        # Callers run on worker threads; one connection is shared between them
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """Get or open the database connection."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, response TEXT, "
+                "created_at INTEGER, expires_at INTEGER)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing/expired."""
+        try:
+            with self._lock:
+                row = self._get_conn().execute(
+                    "SELECT response FROM analyses WHERE key = ? AND expires_at > ?",
+                    (key, int(time.time())),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Analysis cache read failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def set(self, key: str, response: str, ttl: int):
+        """Store a response for ttl seconds."""
+        now = int(time.time())
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)",
+                        (key, response, now, now + ttl),
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+
+
+# Global cache instance
+_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache(path: str) -> AnalysisCache:
+    """Get the global analysis cache instance."""
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache(path)
+    return _cache
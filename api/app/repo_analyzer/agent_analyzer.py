@@ -2,15 +2,48 @@
 
 import os
 import json
+import asyncio
+import hashlib
+import re
 import httpx
+import orjson
 from pathlib import Path
 from typing import Optional
 import logging
 
 from ..config import get_settings
+from ._llm_cache import get_analysis_cache
 
 logger = logging.getLogger(__name__)
 
+# Shared client, so repeated analyses reuse pooled keep-alive connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the OpenRouter HTTP client."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=120.0,
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=30.0
+            )
+        )
+    return _client
+
+
+async def close_agent_client():
+    """Close the OpenRouter HTTP client."""
+    if _client and not _client.is_closed:
+        await _client.aclose()
+
+
+# Bump whenever ANALYZE_PROMPT changes, so cached analyses are not reused
+PROMPT_VERSION = "v1"
 
 ANALYZE_PROMPT = """You are an expert DevOps engineer. Analyze this repository and generate a Dockerfile to run the BACKEND service.
 
@@ -49,6 +82,16 @@ Important:
 
 Return ONLY valid JSON, no markdown code blocks."""
 
+# Body of the first markdown code fence, if the model wrapped its JSON in one
+_FENCE_RE = re.compile(r"```(?:json)?(.*?)(?:```|\Z)", re.DOTALL)
+
+# ANALYZE_PROMPT split around its two fields once, so building a prompt is
+# plain concatenation instead of re-parsing the template with str.format
+_PROMPT_PRE, _rest = ANALYZE_PROMPT.split("{file_tree}")
+_PROMPT_MID, _PROMPT_POST = _rest.split("{file_contents}")
+_PROMPT_POST = _PROMPT_POST.replace("{{", "{").replace("}}", "}")
+del _rest
+
 
 class AgentAnalyzer:
     """Uses LLM to analyze repositories and generate Dockerfiles."""
@@ -57,38 +100,54 @@ class AgentAnalyzer:
         self.repo_path = Path(repo_path)
         self.settings = get_settings()
 
-    def _get_file_tree(self, max_depth: int = 3) -> str:
-        """Generate a file tree representation of the repository."""
+    def _scan_once(self, max_depth: int = 3) -> tuple[str, set[str]]:
+        """
+        Walk the repository once for both the file tree and key file lookup.
+
+        Returns the file tree listing and the set of scanned paths relative to
+        the repo root: every file seen, plus each walked directory with a
+        trailing slash.
+        """
         lines = []
+        present: set[str] = set()
 
-        def walk(path: Path, prefix: str = "", depth: int = 0):
+        # Skip common non-essential directories
+        skip_dirs = {'.git', 'node_modules', '__pycache__', '.venv', 'venv',
+                    'dist', 'build', '.next', '.cache', 'coverage'}
+
+        def walk(path: str, rel: str = "", prefix: str = "", depth: int = 0):
             if depth > max_depth:
                 return
 
-            # Skip common non-essential directories
-            skip_dirs = {'.git', 'node_modules', '__pycache__', '.venv', 'venv',
-                        'dist', 'build', '.next', '.cache', 'coverage'}
-
             try:
-                entries = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name))
+                with os.scandir(path) as it:
+                    # DirEntry caches its type, so these checks don't stat again
+                    entries = sorted(it, key=lambda x: (x.is_file(), x.name))
             except PermissionError:
                 return
 
             dirs = [e for e in entries if e.is_dir() and e.name not in skip_dirs]
             files = [e for e in entries if e.is_file()]
+            present.update(rel + f.name for f in files)
 
             for f in files[:20]:  # Limit files per directory
                 lines.append(f"{prefix}{f.name}")
 
             for d in dirs[:10]:  # Limit subdirectories
                 lines.append(f"{prefix}{d.name}/")
-                walk(d, prefix + "  ", depth + 1)
+                present.add(f"{rel}{d.name}/")
+                walk(d.path, f"{rel}{d.name}/", prefix + "  ", depth + 1)
 
-        walk(self.repo_path)
-        return "\n".join(lines[:100])  # Limit total lines
+        walk(str(self.repo_path))
+        return "\n".join(lines[:100]), present  # Limit total lines
 
-    def _read_key_files(self) -> str:
-        """Read contents of key configuration files."""
+    def _read_key_files(self, present: Optional[set[str]] = None) -> str:
+        """
+        Read contents of key configuration files.
+
+        Files in directories covered by present (from _scan_once) are looked up
+        there rather than stat'ed.
+        """
         key_files = [
             "README.md",
             "package.json",
@@ -119,9 +178,16 @@ class AgentAnalyzer:
         contents = []
         for file_path in key_files:
             full_path = self.repo_path / file_path
-            if full_path.exists() and full_path.is_file():
+            parent = file_path.rpartition("/")[0]
+            if present is not None and (not parent or f"{parent}/" in present):
+                found = file_path in present
+            else:
+                found = full_path.is_file()
+            if found:
                 try:
-                    content = full_path.read_text()
+                    # Read just past the limit, so large files aren't decoded in full
+                    with full_path.open() as f:
+                        content = f.read(3001)
                     # Truncate large files
                     if len(content) > 3000:
                         content = content[:3000] + "\n... (truncated)"
@@ -131,6 +197,11 @@ class AgentAnalyzer:
 
         return "\n\n".join(contents) if contents else "No key files found"
 
+    def _collect_repo_context(self) -> tuple[str, str]:
+        """Build the file tree and key file contents for the prompt (blocking)."""
+        file_tree, present = self._scan_once()
+        return file_tree, self._read_key_files(present)
+
     async def analyze(self) -> dict:
         """
         Use LLM to analyze the repository and generate build configuration.
@@ -139,54 +210,75 @@ class AgentAnalyzer:
             Dict with language, framework, backend_dir, entrypoint, port, dockerfile, explanation
         """
         # Check if OpenRouter is configured
-        api_key = os.environ.get("OPENROUTER_API_KEY", "")
+        api_key = self.settings.openrouter_api_key
         if not api_key:
             logger.warning("OPENROUTER_API_KEY not set, falling back to heuristic analyzer")
             return await self._fallback_analyze()
 
-        file_tree = self._get_file_tree()
-        file_contents = self._read_key_files()
+        # Filesystem work runs in a thread so concurrent LLM calls keep flowing
+        file_tree, file_contents = await asyncio.to_thread(self._collect_repo_context)
 
-        prompt = ANALYZE_PROMPT.format(
-            file_tree=file_tree,
-            file_contents=file_contents
-        )
+        model = self.settings.openrouter_model
 
-        try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "HTTP-Referer": "https://opentrace.local",
-                        "X-Title": "OpenTrace",
-                    },
-                    json={
-                        "model": os.environ.get("OPENROUTER_MODEL", "minimax/minimax-m2.1"),
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.1,  # Low temperature for consistent output
-                    },
-                )
+        # Identical key files under the same model and prompt give the same analysis
+        cache_ttl = self.settings.analysis_cache_ttl
+        cache = get_analysis_cache(self.settings.analysis_cache_path)
+        cache_key = hashlib.sha256(
+            (file_tree + file_contents + model + PROMPT_VERSION).encode()
+        ).hexdigest()
+        if cache_ttl > 0:
+            # sqlite calls block, so they run in a thread like the file reads
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                logger.info("Using cached agent analysis")
+                return json.loads(cached)
 
+        prompt = _PROMPT_PRE + file_tree + _PROMPT_MID + file_contents + _PROMPT_POST
+
+        try:
+            client = _get_client()
+            async with client.stream(
+                "POST",
+                "https://openrouter.ai/api/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "HTTP-Referer": "https://opentrace.local",
+                    "X-Title": "OpenTrace",
+                },
+                json={
+                    "model": model,
+                    "messages": [
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.1,  # Low temperature for consistent output
+                },
+            ) as response:
+                # The status arrives before the body; either way the body is
+                # drained here so the connection goes back to the pool
                 if response.status_code != 200:
-                    logger.error(f"OpenRouter error: {response.status_code} - {response.text}")
-                    return await self._fallback_analyze()
-
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                # Parse JSON response
-                # Handle potential markdown code blocks
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0]
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0]
-
-                analysis = json.loads(content.strip())
-                logger.info(f"Agent analysis: {analysis.get('explanation', 'No explanation')}")
-                return analysis
+                    await response.aread()
+                    body = None
+                else:
+                    body = b"".join([chunk async for chunk in response.aiter_bytes()])
+
+            if body is None:
+                logger.error(f"OpenRouter error: {response.status_code} - {response.text}")
+                return await self._fallback_analyze()
+
+            result = orjson.loads(body)
+            content = result["choices"][0]["message"]["content"]
+
+            # Parse JSON response
+            # Handle potential markdown code blocks
+            match = _FENCE_RE.search(content)
+            if match:
+                content = match.group(1)
+
+            analysis = json.loads(content.strip())
+            logger.info(f"Agent analysis: {analysis.get('explanation', 'No explanation')}")
+            if cache_ttl > 0:
+                await asyncio.to_thread(cache.set, cache_key, json.dumps(analysis), ttl=cache_ttl)
+            return analysis
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response: {e}")
@@ -1,11 +1,11 @@
 """Analyze GitHub repositories to detect language, framework, and entry points."""
 
 import os
-import json
 import re
+import orjson
 from pathlib import Path
 from typing import Optional, Tuple
-import toml
+import tomllib
 
 from ..models import RepoLanguage, RepoFramework
 
@@ -13,6 +13,27 @@ from ..models import RepoLanguage, RepoFramework
 # Common subdirectory names for backend services
 BACKEND_SUBDIRS = ["server", "backend", "api", "src/server", "src/api", "src/backend"]
 
+# Port assignments (port = 8000, PORT: 3000) or app.listen(3000) calls
+_PORT_RE = re.compile(r'(?:(?:port|PORT)\s*[=:]\s*|\.listen\s*\(\s*)(\d+)')
+
+# "node index.js" style start scripts
+_NODE_SCRIPT_RE = re.compile(r"node\s+([^\s]+)")
+
+# Python web frameworks, checked in this priority order when several appear
+_PY_FW_RE = re.compile(r"fastapi|flask|django", re.IGNORECASE)
+_PY_FW_PRIORITY = [
+    ("fastapi", RepoFramework.FASTAPI),
+    ("flask", RepoFramework.FLASK),
+    ("django", RepoFramework.DJANGO),
+]
+
+# Framework imports sit near the top of an entrypoint; port hints can be later
+ENTRYPOINT_HEAD_SIZE = 8192
+PORT_SCAN_SIZE = 16384
+
+# Directories never worth walking when counting source files
+SKIP_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build"})
+
 
 class RepoAnalyzer:
     """Analyzes a cloned repository to detect its configuration."""
@@ -20,6 +41,56 @@ class RepoAnalyzer:
     def __init__(self, repo_path: str):
         self.repo_path = Path(repo_path)
         self.backend_subdir: Optional[str] = None  # Track if backend is in a subdirectory
+        # The same few files are probed and read by several detection steps
+        self._stat_cache: dict[Path, bool] = {}
+        self._read_cache: dict[Path, str] = {}
+        self._head_cache: dict[tuple[Path, int], str] = {}
+        self._toml_cache: dict[Path, dict] = {}
+        self._json_cache: dict[Path, dict] = {}
+        self._dir_cache: dict[Path, dict[str, os.DirEntry]] = {}
+
+    def _list_dir(self, path: Path) -> dict[str, os.DirEntry]:
+        """List a directory's entries by name with one scandir, caching the result."""
+        if path not in self._dir_cache:
+            try:
+                with os.scandir(path) as it:
+                    self._dir_cache[path] = {e.name: e for e in it}
+            except OSError:
+                self._dir_cache[path] = {}
+        return self._dir_cache[path]
+
+    def _exists(self, path: Path) -> bool:
+        """Check whether a path exists, caching the result."""
+        if path not in self._stat_cache:
+            self._stat_cache[path] = path.exists()
+        return self._stat_cache[path]
+
+    def _read(self, path: Path) -> str:
+        """Read a file's text, caching the content."""
+        if path not in self._read_cache:
+            self._read_cache[path] = path.read_text()
+        return self._read_cache[path]
+
+    def _read_head(self, path: Path, size: int) -> str:
+        """Read up to size characters from the start of a file, caching the content."""
+        key = (path, size)
+        if key not in self._head_cache:
+            with path.open(encoding="utf-8", errors="ignore") as f:
+                self._head_cache[key] = f.read(size)
+        return self._head_cache[key]
+
+    def _load_json(self, path: Path) -> dict:
+        """Parse a JSON file from its raw bytes, caching the result."""
+        if path not in self._json_cache:
+            self._json_cache[path] = orjson.loads(path.read_bytes())
+        return self._json_cache[path]
+
+    def _load_toml(self, path: Path) -> dict:
+        """Parse a TOML file, caching the result."""
+        if path not in self._toml_cache:
+            with open(path, "rb") as f:
+                self._toml_cache[path] = tomllib.load(f)
+        return self._toml_cache[path]
 
     def _find_backend_subdir(self) -> Optional[str]:
         """
@@ -27,21 +98,18 @@ class RepoAnalyzer:
         Returns the subdirectory name if found, None otherwise.
         """
         for subdir in BACKEND_SUBDIRS:
-            subdir_path = self.repo_path / subdir
-            if subdir_path.exists() and subdir_path.is_dir():
+            parent, _, name = subdir.rpartition("/")
+            entry = self._list_dir(self.repo_path / parent).get(name)
+            if entry is not None and entry.is_dir():
+                subdir_path = self.repo_path / subdir
+                children = self._list_dir(subdir_path)
                 # Check if this subdir has Python backend indicators
-                if any([
-                    (subdir_path / "requirements.txt").exists(),
-                    (subdir_path / "pyproject.toml").exists(),
-                    (subdir_path / "app.py").exists(),
-                    (subdir_path / "main.py").exists(),
-                ]):
+                if any(f in children for f in ["requirements.txt", "pyproject.toml", "app.py", "main.py"]):
                     return subdir
                 # Check if this subdir has Node.js backend indicators (with express/fastify)
-                pkg_file = subdir_path / "package.json"
-                if pkg_file.exists():
+                if "package.json" in children:
                     try:
-                        data = json.loads(pkg_file.read_text())
+                        data = self._load_json(subdir_path / "package.json")
                         deps = {**data.get("dependencies", {}), **data.get("devDependencies", {})}
                         # Only consider it a backend if it has backend frameworks
                         if any(fw in deps for fw in ["express", "fastify", "@nestjs/core", "koa", "hapi"]):
@@ -64,28 +132,53 @@ class RepoAnalyzer:
 
         # Check for Python indicators (prioritize Python for backend services)
         if any([
-            (effective_path / "requirements.txt").exists(),
-            (effective_path / "pyproject.toml").exists(),
-            (effective_path / "setup.py").exists(),
-            (effective_path / "Pipfile").exists(),
+            self._exists(effective_path / "requirements.txt"),
+            self._exists(effective_path / "pyproject.toml"),
+            self._exists(effective_path / "setup.py"),
+            self._exists(effective_path / "Pipfile"),
         ]):
             return RepoLanguage.PYTHON
 
         # Check for Node.js indicators
-        if (effective_path / "package.json").exists():
+        if self._exists(effective_path / "package.json"):
             return RepoLanguage.NODEJS
 
         # Check file extensions as fallback
-        py_files = list(effective_path.glob("**/*.py"))
-        js_files = list(effective_path.glob("**/*.js")) + list(effective_path.glob("**/*.ts"))
+        py_count, js_count = self._count_source_files(effective_path)
 
-        if len(py_files) > len(js_files):
+        if py_count > js_count:
             return RepoLanguage.PYTHON
-        elif len(js_files) > len(py_files):
+        elif js_count > py_count:
             return RepoLanguage.NODEJS
 
         return RepoLanguage.UNKNOWN
 
+    def _count_source_files(self, root: Path) -> Tuple[int, int]:
+        """
+        Count Python and JS/TS files under root in a single walk.
+
+        Skips dependency/build directories. The walk always runs to the end,
+        so the result doesn't depend on the order directories are visited in.
+        """
+        py_count = js_count = 0
+        stack = [root]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if entry.name.endswith(".py"):
+                            py_count += 1
+                        elif entry.name.endswith((".js", ".ts")):
+                            js_count += 1
+        return py_count, js_count
+
     def detect_framework(self, language: RepoLanguage) -> RepoFramework:
         """Detect the web framework used by the repository."""
         if language == RepoLanguage.PYTHON:
@@ -94,26 +187,30 @@ class RepoAnalyzer:
             return self._detect_nodejs_framework()
         return RepoFramework.UNKNOWN
 
+    def _match_python_framework(self, text: str) -> Optional[RepoFramework]:
+        """Find the highest-priority framework mentioned in text, in one scan."""
+        found = {m.lower() for m in _PY_FW_RE.findall(text)}
+        for name, framework in _PY_FW_PRIORITY:
+            if name in found:
+                return framework
+        return None
+
     def _detect_python_framework(self) -> RepoFramework:
         """Detect Python web framework from dependencies."""
         effective_path = self._get_effective_path()
 
         # Check requirements.txt
         req_file = effective_path / "requirements.txt"
-        if req_file.exists():
-            content = req_file.read_text().lower()
-            if "fastapi" in content:
-                return RepoFramework.FASTAPI
-            if "flask" in content:
-                return RepoFramework.FLASK
-            if "django" in content:
-                return RepoFramework.DJANGO
+        if self._exists(req_file):
+            framework = self._match_python_framework(self._read(req_file))
+            if framework:
+                return framework
 
         # Check pyproject.toml
         pyproject = effective_path / "pyproject.toml"
-        if pyproject.exists():
+        if self._exists(pyproject):
             try:
-                data = toml.load(pyproject)
+                data = self._load_toml(pyproject)
                 deps = []
 
                 # Poetry dependencies
@@ -124,13 +221,9 @@ class RepoAnalyzer:
                 if "project" in data:
                     deps.extend(data["project"].get("dependencies", []))
 
-                deps_str = " ".join(str(d).lower() for d in deps)
-                if "fastapi" in deps_str:
-                    return RepoFramework.FASTAPI
-                if "flask" in deps_str:
-                    return RepoFramework.FLASK
-                if "django" in deps_str:
-                    return RepoFramework.DJANGO
+                framework = self._match_python_framework(" ".join(str(d) for d in deps))
+                if framework:
+                    return framework
             except Exception:
                 pass
 
@@ -140,11 +233,11 @@ class RepoAnalyzer:
         """Detect Node.js web framework from package.json."""
         effective_path = self._get_effective_path()
         pkg_file = effective_path / "package.json"
-        if not pkg_file.exists():
+        if not self._exists(pkg_file):
             return RepoFramework.UNKNOWN
 
         try:
-            data = json.loads(pkg_file.read_text())
+            data = self._load_json(pkg_file)
             deps = {**data.get("dependencies", {}), **data.get("devDependencies", {})}
 
             if "@nestjs/core" in deps:
@@ -184,9 +277,9 @@ class RepoAnalyzer:
 
         for candidate in candidates:
             path = effective_path / candidate
-            if path.exists():
+            if self._exists(path):
                 # Verify it has a FastAPI/Flask/Django app
-                content = path.read_text()
+                content = self._read_head(path, ENTRYPOINT_HEAD_SIZE)
                 if framework == RepoFramework.FASTAPI and "FastAPI" in content:
                     return candidate
                 if framework == RepoFramework.FLASK and "Flask" in content:
@@ -199,9 +292,9 @@ class RepoAnalyzer:
 
         # Check pyproject.toml for scripts
         pyproject = effective_path / "pyproject.toml"
-        if pyproject.exists():
+        if self._exists(pyproject):
             try:
-                data = toml.load(pyproject)
+                data = self._load_toml(pyproject)
                 # Poetry scripts
                 scripts = data.get("tool", {}).get("poetry", {}).get("scripts", {})
                 if scripts:
@@ -214,9 +307,9 @@ class RepoAnalyzer:
     def _find_nodejs_entrypoint(self) -> Optional[str]:
         """Find Node.js application entry point."""
         pkg_file = self.repo_path / "package.json"
-        if pkg_file.exists():
+        if self._exists(pkg_file):
             try:
-                data = json.loads(pkg_file.read_text())
+                data = self._load_json(pkg_file)
 
                 # Check main field
                 main = data.get("main")
@@ -226,7 +319,7 @@ class RepoAnalyzer:
                 # Check scripts.start
                 start_script = data.get("scripts", {}).get("start", "")
                 # Extract file from "node index.js" or similar
-                match = re.search(r"node\s+([^\s]+)", start_script)
+                match = _NODE_SCRIPT_RE.search(start_script)
                 if match:
                     return match.group(1)
 
@@ -235,7 +328,7 @@ class RepoAnalyzer:
 
         # Common entry points
         for candidate in ["index.js", "app.js", "server.js", "src/index.js", "src/app.js"]:
-            if (self.repo_path / candidate).exists():
+            if self._exists(self.repo_path / candidate):
                 return candidate
 
         return None
@@ -256,18 +349,12 @@ class RepoAnalyzer:
         entrypoint = self.find_entrypoint(language, framework)
         if entrypoint:
             entry_path = self.repo_path / entrypoint
-            if entry_path.exists():
-                content = entry_path.read_text()
+            if self._exists(entry_path):
+                content = self._read_head(entry_path, PORT_SCAN_SIZE)
                 # Look for port definitions
-                port_patterns = [
-                    r'port\s*[=:]\s*(\d+)',
-                    r'PORT\s*[=:]\s*(\d+)',
-                    r'\.listen\s*\(\s*(\d+)',
-                ]
-                for pattern in port_patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        return int(match.group(1))
+                match = _PORT_RE.search(content)
+                if match:
+                    return int(match.group(1))
 
         return default_ports.get(framework, 8000)
 
@@ -1,42 +1,15 @@
 """Generate instrumented Dockerfiles for different languages and frameworks."""
 
+import hashlib
+from functools import lru_cache
+
 from ..models import RepoLanguage, RepoFramework
 
 
-def generate_python_dockerfile(
-    framework: RepoFramework,
-    entrypoint: str,
-    port: int = 8000
-) -> str:
-    """Generate a Dockerfile for Python applications with OTel instrumentation."""
-
-    # Determine the run command based on framework
-    if framework == RepoFramework.FASTAPI:
-        # Try to parse the module:app pattern from entrypoint
-        if entrypoint:
-            # Convert path to module notation
-            module = entrypoint.replace("/", ".").replace(".py", "")
-            run_cmd = f'["opentelemetry-instrument", "uvicorn", "{module}:app", "--host", "0.0.0.0", "--port", "{port}"]'
-        else:
-            run_cmd = f'["opentelemetry-instrument", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "{port}"]'
-    elif framework == RepoFramework.FLASK:
-        if entrypoint:
-            module = entrypoint.replace("/", ".").replace(".py", "")
-            run_cmd = f'["opentelemetry-instrument", "flask", "run", "--host", "0.0.0.0", "--port", "{port}"]'
-        else:
-            run_cmd = f'["opentelemetry-instrument", "flask", "run", "--host", "0.0.0.0", "--port", "{port}"]'
-    elif framework == RepoFramework.DJANGO:
-        run_cmd = f'["opentelemetry-instrument", "python", "manage.py", "runserver", "0.0.0.0:{port}"]'
-    else:
-        # Generic Python app
-        if entrypoint:
-            run_cmd = f'["opentelemetry-instrument", "python", "{entrypoint}"]'
-        else:
-            run_cmd = '["opentelemetry-instrument", "python", "main.py"]'
-
-    dockerfile = f'''FROM python:3.11-slim
-
-WORKDIR /app
+# Shared base for generated Python images. System packages and the OTel
+# distro are the same for every repo, so they are built once and reused;
+# see BASE_IMAGES
+_PY_OTEL_BASE_DOCKERFILE = '''FROM python:3.11-slim
 
 # Install system dependencies
 RUN apt-get update && apt-get install -y --no-install-recommends \\
@@ -44,19 +17,69 @@ RUN apt-get update && apt-get install -y --no-install-recommends \\
     libpq-dev \\
     && rm -rf /var/lib/apt/lists/*
 
-# Copy all files first (dependency files may vary)
-COPY . .
+# Install OpenTelemetry instrumentation
+RUN pip install --no-cache-dir \\
+    opentelemetry-distro \\
+    opentelemetry-exporter-otlp \\
+    opentelemetry-instrumentation-fastapi \\
+    opentelemetry-instrumentation-flask \\
+    opentelemetry-instrumentation-django \\
+    opentelemetry-instrumentation-httpx \\
+    opentelemetry-instrumentation-requests \\
+    opentelemetry-instrumentation-sqlalchemy \\
+    opentelemetry-instrumentation-redis \\
+    opentelemetry-instrumentation-psycopg2
+'''
+
+# The tag carries a hash of the base Dockerfile, so editing it produces a new
+# tag and hosts holding the old image build the new one
+PYTHON_OTEL_BASE_IMAGE = (
+    "opentrace-python-otel-base:3.11-"
+    + hashlib.sha256(_PY_OTEL_BASE_DOCKERFILE.encode()).hexdigest()[:12]
+)
+
+# Base image tags used by generated Dockerfiles, mapped to the Dockerfile that builds them
+BASE_IMAGES = {
+    PYTHON_OTEL_BASE_IMAGE: _PY_OTEL_BASE_DOCKERFILE,
+}
+
+# Empty file the runner adds to every build context, so a COPY of optional
+# files always has at least one source
+CONTEXT_STUB_NAME = ".opentrace-context"
+
+# Dockerfile bodies, filled in with str.format by the generators below
+_PY_DOCKERFILE_TMPL = f"FROM {PYTHON_OTEL_BASE_IMAGE}" + '''
+
+WORKDIR /app
+
+# Copy dependency manifests first, so the install layers below stay cached
+# until they change. The context stub keeps this COPY valid when none of
+# the optional files exist.
+COPY ''' + CONTEXT_STUB_NAME + ''' requirements.txt* pyproject.toml* poetry.lock* ./
 
 # Install Python dependencies with multiple fallback strategies
 RUN if [ -f requirements.txt ]; then \\
         echo "Installing from requirements.txt..." && \\
         pip install --no-cache-dir -r requirements.txt; \\
+    elif [ -f pyproject.toml ] && grep -q "tool.poetry" pyproject.toml 2>/dev/null; then \\
+        echo "Installing Poetry dependencies..." && \\
+        pip install --no-cache-dir poetry 2>/dev/null && \\
+        poetry config virtualenvs.create false && \\
+        poetry install --no-root --no-interaction --no-ansi || true; \\
+    else \\
+        echo "No dependency manifest to pre-install, continuing"; \\
+    fi
+
+# Copy the application source
+COPY . .
+
+# Projects without requirements.txt may need their own source to install
+RUN if [ -f requirements.txt ]; then \\
+        echo "Dependencies already installed from requirements.txt"; \\
     elif [ -f pyproject.toml ]; then \\
         echo "Installing from pyproject.toml..." && \\
-        pip install --no-cache-dir poetry 2>/dev/null || true && \\
         if command -v poetry &> /dev/null && grep -q "tool.poetry" pyproject.toml 2>/dev/null; then \\
             echo "Using Poetry..." && \\
-            poetry config virtualenvs.create false && \\
             poetry install --no-interaction --no-ansi || pip install --no-cache-dir . || true; \\
         else \\
             echo "Using pip with pyproject.toml..." && \\
@@ -69,19 +92,6 @@ RUN if [ -f requirements.txt ]; then \\
         echo "No dependency file found, skipping dependency installation"; \\
     fi
 
-# Install OpenTelemetry instrumentation
-RUN pip install --no-cache-dir \\
-    opentelemetry-distro \\
-    opentelemetry-exporter-otlp \\
-    opentelemetry-instrumentation-fastapi \\
-    opentelemetry-instrumentation-flask \\
-    opentelemetry-instrumentation-django \\
-    opentelemetry-instrumentation-httpx \\
-    opentelemetry-instrumentation-requests \\
-    opentelemetry-instrumentation-sqlalchemy \\
-    opentelemetry-instrumentation-redis \\
-    opentelemetry-instrumentation-psycopg2
-
 # Auto-install all available instrumentations
 RUN opentelemetry-bootstrap -a install || true
 
@@ -94,73 +104,64 @@ EXPOSE {port}
 
 CMD {run_cmd}
 '''
-    return dockerfile
-
-
-def generate_nodejs_dockerfile(
-    framework: RepoFramework,
-    entrypoint: str,
-    port: int = 3000
-) -> str:
-    """Generate a Dockerfile for Node.js applications with OTel instrumentation."""
 
-    # Build startup script content
-    script_lines = ['#!/bin/sh']
-    script_lines.append('')
-    script_lines.append('# Try detected entrypoint first (most reliable)')
-    if entrypoint:
-        script_lines.append(f'if [ -f "{entrypoint}" ]; then')
-        script_lines.append(f'    echo "Starting with detected entrypoint: {entrypoint}"')
-        script_lines.append(f'    exec node "{entrypoint}"')
-        script_lines.append('fi')
-        script_lines.append('')
-    
-    # Try npm start, but catch errors
-    script_lines.append('# Try npm start (if package.json has start script)')
-    script_lines.append('if [ -f package.json ] && grep -q \'"start"\' package.json 2>/dev/null; then')
-    script_lines.append('    echo "Attempting: npm start"')
-    script_lines.append('    # Check if npm start would work by testing the command')
-    script_lines.append('    START_SCRIPT=$(node -p "require(\'./package.json\').scripts?.start || \'\'" 2>/dev/null || echo "")')
-    script_lines.append('    if [ -n "$START_SCRIPT" ]; then')
-    script_lines.append('        # Extract JS file from command (e.g., "node index.js" -> "index.js")')
-    script_lines.append('        JS_FILE=$(echo "$START_SCRIPT" | sed -n "s/.*node[[:space:]]*\\([^[:space:]]*\\.js\\).*/\\1/p" | head -1)')
-    script_lines.append('        if [ -n "$JS_FILE" ] && [ ! -f "$JS_FILE" ]; then')
-    script_lines.append('            echo "Warning: npm start references $JS_FILE which does not exist, skipping"')
-    script_lines.append('        else')
-    script_lines.append('            exec npm start')
-    script_lines.append('        fi')
-    script_lines.append('    else')
-    script_lines.append('        exec npm start')
-    script_lines.append('    fi')
-    script_lines.append('fi')
-    script_lines.append('')
-    
-    # Try common entrypoints
-    script_lines.append('# Try common entrypoints')
-    for common_file in ['index.js', 'app.js', 'server.js', 'src/index.js', 'src/app.js']:
-        script_lines.append(f'if [ -f "{common_file}" ]; then')
-        script_lines.append(f'    echo "Starting with: {common_file}"')
-        script_lines.append(f'    exec node "{common_file}"')
-        script_lines.append('fi')
-    
-    # Last resort: find any .js file in root
-    script_lines.append('')
-    script_lines.append('# Last resort: find any .js file in root directory')
-    script_lines.append('JS_FILE=$(find /app -maxdepth 1 -name "*.js" -type f | head -1)')
-    script_lines.append('if [ -n "$JS_FILE" ]; then')
-    script_lines.append('    echo "Starting with found file: $JS_FILE"')
-    script_lines.append('    exec node "$JS_FILE"')
-    script_lines.append('fi')
-    script_lines.append('')
-    
-    script_lines.append('echo "Error: No entrypoint found"')
-    script_lines.append('echo "Available .js files:"')
-    script_lines.append('find /app -name "*.js" -type f | head -10')
-    script_lines.append('exit 1')
-    
-    script_content = '\n'.join(script_lines)
-
-    dockerfile = f'''FROM node:20-slim
+# Node.js start script; falls back through npm start and common entrypoints
+_NODE_START_SH_TMPL = r'''#!/bin/sh
+
+# Try detected entrypoint first (most reliable)
+{entry_block}# Try npm start (if package.json has start script)
+if [ -f package.json ] && grep -q '"start"' package.json 2>/dev/null; then
+    echo "Attempting: npm start"
+    # Check if npm start would work by testing the command
+    START_SCRIPT=$(node -p "require('./package.json').scripts?.start || ''" 2>/dev/null || echo "")
+    if [ -n "$START_SCRIPT" ]; then
+        # Extract JS file from command (e.g., "node index.js" -> "index.js")
+        JS_FILE=$(echo "$START_SCRIPT" | sed -n "s/.*node[[:space:]]*\([^[:space:]]*\.js\).*/\1/p" | head -1)
+        if [ -n "$JS_FILE" ] && [ ! -f "$JS_FILE" ]; then
+            echo "Warning: npm start references $JS_FILE which does not exist, skipping"
+        else
+            exec npm start
+        fi
+    else
+        exec npm start
+    fi
+fi
+
+# Try common entrypoints
+if [ -f "index.js" ]; then
+    echo "Starting with: index.js"
+    exec node "index.js"
+fi
+if [ -f "app.js" ]; then
+    echo "Starting with: app.js"
+    exec node "app.js"
+fi
+if [ -f "server.js" ]; then
+    echo "Starting with: server.js"
+    exec node "server.js"
+fi
+if [ -f "src/index.js" ]; then
+    echo "Starting with: src/index.js"
+    exec node "src/index.js"
+fi
+if [ -f "src/app.js" ]; then
+    echo "Starting with: src/app.js"
+    exec node "src/app.js"
+fi
+
+# Last resort: find any .js file in root directory
+JS_FILE=$(find /app -maxdepth 1 -name "*.js" -type f | head -1)
+if [ -n "$JS_FILE" ]; then
+    echo "Starting with found file: $JS_FILE"
+    exec node "$JS_FILE"
+fi
+
+echo "Error: No entrypoint found"
+echo "Available .js files:"
+find /app -name "*.js" -type f | head -10
+exit 1'''
+
+_NODE_DOCKERFILE_TMPL = '''FROM node:20-slim
 
 WORKDIR /app
 
@@ -206,9 +207,65 @@ EXPOSE {port}
 
 CMD ["/app/start.sh"]
 '''
-    return dockerfile
 
 
+def generate_python_dockerfile(
+    framework: RepoFramework,
+    entrypoint: str,
+    port: int = 8000
+) -> str:
+    """Generate a Dockerfile for Python applications with OTel instrumentation."""
+
+    # Determine the run command based on framework
+    if framework == RepoFramework.FASTAPI:
+        # Try to parse the module:app pattern from entrypoint
+        if entrypoint:
+            # Convert path to module notation
+            module = entrypoint.replace("/", ".").replace(".py", "")
+            run_cmd = f'["opentelemetry-instrument", "uvicorn", "{module}:app", "--host", "0.0.0.0", "--port", "{port}"]'
+        else:
+            run_cmd = f'["opentelemetry-instrument", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "{port}"]'
+    elif framework == RepoFramework.FLASK:
+        if entrypoint:
+            module = entrypoint.replace("/", ".").replace(".py", "")
+            run_cmd = f'["opentelemetry-instrument", "flask", "run", "--host", "0.0.0.0", "--port", "{port}"]'
+        else:
+            run_cmd = f'["opentelemetry-instrument", "flask", "run", "--host", "0.0.0.0", "--port", "{port}"]'
+    elif framework == RepoFramework.DJANGO:
+        run_cmd = f'["opentelemetry-instrument", "python", "manage.py", "runserver", "0.0.0.0:{port}"]'
+    else:
+        # Generic Python app
+        if entrypoint:
+            run_cmd = f'["opentelemetry-instrument", "python", "{entrypoint}"]'
+        else:
+            run_cmd = '["opentelemetry-instrument", "python", "main.py"]'
+
+    return _PY_DOCKERFILE_TMPL.format(run_cmd=run_cmd, port=port)
+
+
+def generate_nodejs_dockerfile(
+    framework: RepoFramework,
+    entrypoint: str,
+    port: int = 3000
+) -> str:
+    """Generate a Dockerfile for Node.js applications with OTel instrumentation."""
+
+    # Startup script: the detected entrypoint (if any) is tried first
+    entry_block = ""
+    if entrypoint:
+        entry_block = (
+            f'if [ -f "{entrypoint}" ]; then\n'
+            f'    echo "Starting with detected entrypoint: {entrypoint}"\n'
+            f'    exec node "{entrypoint}"\n'
+            'fi\n'
+            '\n'
+        )
+    script_content = _NODE_START_SH_TMPL.format(entry_block=entry_block)
+
+    return _NODE_DOCKERFILE_TMPL.format(script_content=script_content, port=port)
+
+
+@lru_cache(maxsize=256)
 def generate_dockerfile(
     language: RepoLanguage,
     framework: RepoFramework,
@@ -226,6 +283,8 @@ def generate_dockerfile(
 
     Returns:
         Dockerfile content as a string
+
+    The output depends only on the arguments, so results are memoized.
     """
     if language == RepoLanguage.PYTHON:
         return generate_python_dockerfile(framework, entrypoint, port)
@@ -1,37 +1,96 @@
 """Manage repository analysis, building, and running."""
 
-import os
+import re
+import ast
+import mmap
 import uuid
+import subprocess
 import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
-import git
 import logging
 
 from ..config import get_settings
 from ..models import RepoInfo, RepoStatus, RepoLanguage, RepoFramework
-from .analyzer import RepoAnalyzer
 from .agent_analyzer import AgentAnalyzer
 from .dockerfile_gen import generate_dockerfile
 from .runner import get_container_runner
 
 logger = logging.getLogger(__name__)
 
+# Tracked repos are capped; the least recently used idle ones are dropped first
+MAX_REPOS = 1024
+_BUSY_STATUSES = frozenset({RepoStatus.ANALYZING, RepoStatus.BUILDING, RepoStatus.RUNNING})
+
+# Host ports handed to repo containers; one per tracked repo, reclaimed on eviction
+PORT_RANGE = range(9000, 9000 + MAX_REPOS)
+
+# Ports tried when starting a container whose host port is held by something else
+MAX_PORT_ATTEMPTS = 3
+_PORT_CONFLICT_RE = re.compile(r"port is already allocated|address already in use", re.IGNORECASE)
+
+# HTTP methods recognized as route declarations, by both the ast and regex scans
+_ROUTE_METHODS = frozenset({"get", "post", "put", "delete", "patch"})
+_METHOD_ALT = "|".join(sorted(_ROUTE_METHODS)).encode()
+
+# Route declarations, per language: FastAPI/Flask decorators (@app.get,
+# @router.post, ...) and Express/Fastify calls, each matched in one pass.
+# Bytes patterns, so they can run directly over a memory-mapped file
+_ROUTE_PATTERNS = {
+    RepoLanguage.PYTHON: re.compile(rb'@\w+\.(?:' + _METHOD_ALT + rb')\s*\(\s*["\']([^"\']+)["\']'),
+    RepoLanguage.NODEJS: re.compile(rb'\.(?:' + _METHOD_ALT + rb')\s*\(\s*["\']([^"\']+)["\']'),
+}
+MAX_ENDPOINTS = 20
+
+# Python entry files up to this size are parsed for route decorators;
+# larger or unparsable ones fall back to the regex scan
+MAX_AST_PARSE_SIZE = 1024 * 1024
+
+
+class NoFreePortError(Exception):
+    """Raised when every host port in PORT_RANGE is assigned to a repo."""
+
 
 class RepoManager:
     """Manages the lifecycle of analyzed repositories."""
 
     def __init__(self):
         self.settings = get_settings()
-        self.repos: dict[str, RepoInfo] = {}
+        self.repos_base_path = Path(self.settings.repos_base_path)
+        self.repos: OrderedDict[str, RepoInfo] = OrderedDict()
         self._agent_analysis: dict[str, dict] = {}  # Store agent analysis results
-        self._port_counter = 9000  # Start assigning ports from 9000
+        self._free_ports = deque(PORT_RANGE)
+        # Clones get their own threads, so a slow clone doesn't starve the default executor
+        self._clone_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="git-clone")
 
     def _get_next_port(self) -> int:
-        """Get the next available port for a container."""
-        port = self._port_counter
-        self._port_counter += 1
-        return port
+        """
+        Get the next unassigned port for a container.
+
+        Whether the host port is actually free is only known when Docker
+        publishes it; start() moves to another port on a bind conflict.
+        """
+        if not self._free_ports:
+            raise NoFreePortError("No free ports available for repo containers")
+        return self._free_ports.popleft()
+
+    def _release_port(self, port: Optional[int]):
+        """Return a repo's port to the pool."""
+        if port in PORT_RANGE:
+            self._free_ports.append(port)
+
+    def _evict_if_needed(self):
+        """Drop the least recently used idle repos while over MAX_REPOS."""
+        if len(self.repos) < MAX_REPOS:
+            return
+        for repo_id in list(self.repos):
+            if len(self.repos) < MAX_REPOS:
+                break
+            if self.repos[repo_id].status not in _BUSY_STATUSES:
+                self._release_port(self.repos.pop(repo_id).port)
+                self._agent_analysis.pop(repo_id, None)
 
     def _generate_repo_id(self, github_url: str) -> str:
         """Generate a unique repo ID from the GitHub URL."""
@@ -58,6 +117,7 @@ class RepoManager:
             RepoInfo with analysis results
         """
         repo_id = self._generate_repo_id(github_url)
+        self._evict_if_needed()
         host_port = self._get_next_port()
 
         # Create initial repo info
@@ -71,15 +131,15 @@ class RepoManager:
 
         try:
             # Clone repository
-            repo_path = Path(self.settings.repos_base_path) / repo_id
+            repo_path = self.repos_base_path / repo_id
             repo_path.parent.mkdir(parents=True, exist_ok=True)
 
             logger.info(f"Cloning {github_url} to {repo_path}")
 
             # Clone in thread pool
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             await loop.run_in_executor(
-                None,
+                self._clone_pool,
                 self._clone_repo,
                 github_url,
                 str(repo_path),
@@ -127,23 +187,24 @@ class RepoManager:
                     analysis["entrypoint"]
                 )
 
-            self.repos[repo_id] = repo_info
             return repo_info
 
         except Exception as e:
             logger.error(f"Failed to analyze repo: {e}")
             repo_info.status = RepoStatus.ERROR
             repo_info.error_message = str(e)
-            self.repos[repo_id] = repo_info
             return repo_info
 
     def _clone_repo(self, url: str, path: str, branch: Optional[str]):
         """Clone a git repository (synchronous)."""
-        kwargs = {"depth": 1}  # Shallow clone for speed
+        cmd = ["git", "clone", "--depth=1", "--single-branch"]  # Shallow clone for speed
         if branch:
-            kwargs["branch"] = branch
+            cmd += ["--branch", branch]
+        cmd += ["--", url, path]
 
-        git.Repo.clone_from(url, path, **kwargs)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"git clone failed: {result.stderr.strip()}")
 
     def _detect_endpoints(
         self,
@@ -155,37 +216,56 @@ class RepoManager:
         endpoints = []
         entry_file = repo_path / entrypoint
 
-        if not entry_file.exists():
+        pattern = _ROUTE_PATTERNS.get(language)
+        if not pattern or not entry_file.exists():
+            return endpoints
+        size = entry_file.stat().st_size
+        if size == 0:
             return endpoints
 
+        if language == RepoLanguage.PYTHON and size <= MAX_AST_PARSE_SIZE:
+            try:
+                return self._detect_python_routes(entry_file.read_bytes())
+            except (SyntaxError, ValueError):
+                pass  # Not valid Python for this interpreter; use the regex scan
+            except Exception as e:
+                logger.warning(f"Failed to parse {entrypoint} for endpoints, scanning instead: {e}")
+
         try:
-            content = entry_file.read_text()
-
-            if language == RepoLanguage.PYTHON:
-                # Look for FastAPI/Flask route decorators
-                import re
-                patterns = [
-                    r'@\w+\.(?:get|post|put|delete)\s*\(\s*["\']([^"\']+)["\']',
-                    r'@router\.(?:get|post|put|delete)\s*\(\s*["\']([^"\']+)["\']',
-                ]
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    endpoints.extend(matches)
-
-            elif language == RepoLanguage.NODEJS:
-                # Look for Express/Fastify routes
-                import re
-                patterns = [
-                    r'\.(?:get|post|put|delete)\s*\(\s*["\']([^"\']+)["\']',
-                ]
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    endpoints.extend(matches)
+            # Scan the mapped file in place; only matched paths are decoded
+            seen: dict[str, None] = {}
+            with entry_file.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                for match in pattern.finditer(content):
+                    seen[match.group(1).decode("utf-8", errors="replace")] = None
+                    if len(seen) >= MAX_ENDPOINTS:
+                        break
+            endpoints = list(seen)
 
         except Exception as e:
             logger.warning(f"Failed to detect endpoints: {e}")
 
-        return list(set(endpoints))[:20]  # Limit to 20 unique endpoints
+        return endpoints
+
+    def _detect_python_routes(self, source: bytes) -> list[str]:
+        """Find route paths from @x.get("/path")-style decorators by parsing the source."""
+        routes = []
+        for node in ast.walk(ast.parse(source)):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for dec in node.decorator_list:
+                if (
+                    isinstance(dec, ast.Call)
+                    and isinstance(dec.func, ast.Attribute)
+                    and dec.func.attr in _ROUTE_METHODS
+                    and dec.args
+                    and isinstance(dec.args[0], ast.Constant)
+                    and isinstance(dec.args[0].value, str)
+                ):
+                    routes.append((dec.lineno, dec.col_offset, dec.args[0].value))
+
+        # ast.walk is breadth-first; report paths in source order
+        routes.sort()
+        return list(dict.fromkeys(path for _, _, path in routes))[:MAX_ENDPOINTS]
 
     async def start(self, repo_id: str) -> Optional[RepoInfo]:
         """
@@ -197,7 +277,7 @@ class RepoManager:
         Returns:
             Updated RepoInfo or None if not found
         """
-        repo_info = self.repos.get(repo_id)
+        repo_info = self.get_repo(repo_id)
         if not repo_info:
             return None
 
@@ -206,9 +286,8 @@ class RepoManager:
 
         try:
             repo_info.status = RepoStatus.BUILDING
-            self.repos[repo_id] = repo_info
 
-            repo_path = Path(self.settings.repos_base_path) / repo_id
+            repo_path = self.repos_base_path / repo_id
 
             # Get agent analysis if available
             analysis = self._agent_analysis.get(repo_id, {})
@@ -248,7 +327,6 @@ class RepoManager:
             if not success:
                 repo_info.status = RepoStatus.ERROR
                 repo_info.error_message = f"Build failed: {error}"
-                self.repos[repo_id] = repo_info
                 return repo_info
 
             # Run container
@@ -256,24 +334,31 @@ class RepoManager:
             container_name = f"opentrace-{repo_id}"
             service_name = repo_id.split("-")[0]  # Use repo name as service
 
-            container_id, error = await runner.run_container(
-                image_tag=image_tag,
-                container_name=container_name,
-                port=internal_port,
-                host_port=repo_info.port,
-                service_name=service_name
-            )
+            for _ in range(MAX_PORT_ATTEMPTS):
+                container_id, error = await runner.run_container(
+                    image_tag=image_tag,
+                    container_name=container_name,
+                    port=internal_port,
+                    host_port=repo_info.port,
+                    service_name=service_name
+                )
+                if container_id or not _PORT_CONFLICT_RE.search(error or ""):
+                    break
+                # Something outside OpenTrace holds this host port; it goes to
+                # the back of the pool and the next one is tried
+                busy_port = repo_info.port
+                repo_info.port = self._get_next_port()
+                self._release_port(busy_port)
+                logger.info(f"Host port {busy_port} in use, retrying on {repo_info.port}")
 
             if not container_id:
                 repo_info.status = RepoStatus.ERROR
                 repo_info.error_message = f"Run failed: {error}"
-                self.repos[repo_id] = repo_info
                 return repo_info
 
             repo_info.container_id = container_id
             repo_info.status = RepoStatus.RUNNING
             repo_info.error_message = None
-            self.repos[repo_id] = repo_info
 
             return repo_info
 
@@ -281,7 +366,6 @@ class RepoManager:
             logger.error(f"Failed to start repo: {e}")
             repo_info.status = RepoStatus.ERROR
             repo_info.error_message = str(e)
-            self.repos[repo_id] = repo_info
             return repo_info
 
     async def stop(self, repo_id: str) -> Optional[RepoInfo]:
@@ -294,7 +378,7 @@ class RepoManager:
         Returns:
             Updated RepoInfo or None if not found
         """
-        repo_info = self.repos.get(repo_id)
+        repo_info = self.get_repo(repo_id)
         if not repo_info:
             return None
 
@@ -303,7 +387,8 @@ class RepoManager:
 
         try:
             runner = get_container_runner()
-            success, error = await runner.stop_container(repo_info.container_id)
+            # Graceful so the OTel exporter flushes the last spans before the container dies
+            success, error = await runner.stop_container(repo_info.container_id, graceful=True)
 
             if success:
                 repo_info.status = RepoStatus.STOPPED
@@ -311,18 +396,19 @@ class RepoManager:
             else:
                 repo_info.error_message = f"Stop failed: {error}"
 
-            self.repos[repo_id] = repo_info
             return repo_info
 
         except Exception as e:
             logger.error(f"Failed to stop repo: {e}")
             repo_info.error_message = str(e)
-            self.repos[repo_id] = repo_info
             return repo_info
 
     def get_repo(self, repo_id: str) -> Optional[RepoInfo]:
         """Get repository info by ID."""
-        return self.repos.get(repo_id)
+        repo_info = self.repos.get(repo_id)
+        if repo_info is not None:
+            self.repos.move_to_end(repo_id)
+        return repo_info
 
     def list_repos(self) -> list[RepoInfo]:
         """List all repositories."""
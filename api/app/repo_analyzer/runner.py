@@ -1,28 +1,91 @@
 """Build and run Docker containers for analyzed repositories."""
 
 import asyncio
+import codecs
+import functools
+import io
 import os
-import docker
-from docker.errors import DockerException, ImageNotFound, APIError
-from typing import Optional
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, AsyncIterator, Callable, Optional
 import logging
 
+import httpx
+import orjson
+
+from .dockerfile_gen import BASE_IMAGES, CONTEXT_STUB_NAME
+
 logger = logging.getLogger(__name__)
 
+# Seconds a Docker ping result is trusted before pinging again; connection
+# failures in other calls expire it early
+AVAILABILITY_TTL = 30.0
+
+# Exporter settings shared by every repo container; the endpoint and service
+# name are merged in per run
+_BASE_OTEL_ENV = {
+    "OTEL_TRACES_EXPORTER": "otlp",
+    "OTEL_EXPORTER_OTLP_PROTOCOL": "grpc",
+}
+
+# Name of the generated Dockerfile inside the build context
+DOCKERFILE_NAME = "Dockerfile.opentrace"
+
+# Build contexts are kept in memory up to this size before spilling to disk
+CONTEXT_SPOOL_SIZE = 32 * 1024 * 1024
+
+# Chunk size used when uploading a build context
+CONTEXT_CHUNK_SIZE = 64 * 1024
+
+# Build output lines kept for error messages
+BUILD_LOG_TAIL = 30
+
+
+async def _iter_file(fileobj: IO[bytes], executor: ThreadPoolExecutor) -> AsyncIterator[bytes]:
+    """Yield a local file in chunks, for use as a streamed request body."""
+    # Large contexts have spilled to disk, so each read runs off the event loop
+    loop = asyncio.get_running_loop()
+    while chunk := await loop.run_in_executor(executor, fileobj.read, CONTEXT_CHUNK_SIZE):
+        yield chunk
+
 
 class ContainerRunner:
     """Manages building and running Docker containers for repositories."""
 
     def __init__(self):
+        # Blocking Docker calls get their own threads, so a slow daemon can't
+        # starve the default executor shared with the rest of the app
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="docker-io")
+        # Builds stream over this async client instead of holding a docker-py thread
+        self._http: Optional[httpx.AsyncClient] = None
+        self._socket_path: Optional[str] = None
+        # Last ping result, trusted until _available_until; once stale it is
+        # refreshed in the background while callers keep getting the last value
+        self._available = True
+        self._available_until = 0.0
+        self._refreshing = False
+
+        # docker-py is heavy to import, so it is loaded with the first runner
+        # rather than at API startup
+        import docker
+        from docker.errors import DockerException
+
         try:
             # Try to connect using the Unix socket directly
             socket_path = os.environ.get("DOCKER_HOST", "unix:///var/run/docker.sock")
             if socket_path.startswith("unix://"):
-                self.client = docker.DockerClient(base_url=socket_path)
+                self._socket_path = socket_path[len("unix://"):]
+                # One long-lived client; its connection pools are shared by every call
+                self.client = docker.DockerClient(base_url=socket_path, num_pools=16)
             else:
                 self.client = docker.from_env()
             # Verify connection works
             self.client.ping()
+            self._available_until = time.monotonic() + AVAILABILITY_TTL
             logger.info("Successfully connected to Docker")
         except DockerException as e:
             logger.warning(f"Failed to connect to Docker: {e}")
@@ -32,14 +95,74 @@ class ContainerRunner:
             self.client = None
 
     def is_available(self) -> bool:
-        """Check if Docker is available."""
+        """
+        Check if Docker is available from the last ping result.
+
+        A stale result is returned as-is while a ping runs on the runner's
+        threads, so callers on the event loop never wait on the daemon.
+        Outside an event loop the ping runs inline.
+        """
         if not self.client:
             return False
+        if time.monotonic() >= self._available_until:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._ping()
+            else:
+                if not self._refreshing:
+                    self._refreshing = True
+                    loop.run_in_executor(self._executor, self._ping)
+        return self._available
+
+    def _ping(self):
+        """Ping the daemon and trust the result for AVAILABILITY_TTL seconds."""
         try:
             self.client.ping()
-            return True
+            self._available = True
         except Exception:
-            return False
+            self._available = False
+        self._available_until = time.monotonic() + AVAILABILITY_TTL
+        self._refreshing = False
+
+    def _note_failure(self, error: Exception):
+        """Mark Docker unavailable until a fresh ping succeeds if the daemon went away."""
+        import requests
+
+        # Build failures are re-raised with the build log, chaining the original error
+        if isinstance(error.__cause__ or error, (requests.exceptions.ConnectionError, httpx.NetworkError)):
+            self._available = False
+            self._available_until = 0.0
+
+    async def close(self):
+        """Close the build HTTP client and the Docker thread pool."""
+        if self._http and not self._http.is_closed:
+            await self._http.aclose()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        """Run a blocking Docker call on the runner's threads, via _with_retry."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._with_retry, fn, *args, **kwargs)
+        )
+
+    def _with_retry(self, fn: Callable, *args, **kwargs):
+        """
+        Call a Docker API function, retrying once on a dropped connection.
+
+        Pooled keepalive sockets go stale when dockerd restarts; closing the
+        client's session makes the retry open fresh connections.
+        """
+        import requests
+        import urllib3
+
+        try:
+            return fn(*args, **kwargs)
+        except (requests.exceptions.ConnectionError, urllib3.exceptions.ProtocolError) as e:
+            logger.info(f"Docker connection dropped ({e}), reconnecting")
+            self.client.api.close()
+            return fn(*args, **kwargs)
 
     async def build_image(
         self,
@@ -62,58 +185,148 @@ class ContainerRunner:
             return False, "Docker is not available"
 
         try:
-            # Write Dockerfile to repo
-            dockerfile_path = f"{repo_path}/Dockerfile.opentrace"
-            with open(dockerfile_path, "w") as f:
-                f.write(dockerfile_content)
-
-            # Build image in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                self._build_sync,
-                repo_path,
-                image_tag,
-                dockerfile_path
+            await self._ensure_base_images(dockerfile_content)
+
+            # Packing the context is disk-bound, so it runs off the event loop
+            loop = asyncio.get_running_loop()
+            context = await loop.run_in_executor(
+                self._executor, self._build_context, repo_path, dockerfile_content
             )
+            with context:
+                await self._stream_build(
+                    context,
+                    {
+                        "t": image_tag,
+                        "dockerfile": DOCKERFILE_NAME,
+                        "rm": 1,  # Remove intermediate containers
+                        "forcerm": 1,  # Always remove intermediate containers
+                        "networkmode": "host",  # Use host network for npm/pip to access internet
+                        "cachefrom": orjson.dumps([image_tag]).decode(),  # Reuse layers from this repo's previous image
+                    },
+                )
+            logger.info(f"Successfully built image {image_tag}")
 
             return True, None
 
         except Exception as e:
+            self._note_failure(e)
             logger.error(f"Failed to build image: {e}")
             return False, str(e)
 
-    def _build_sync(self, repo_path: str, image_tag: str, dockerfile_path: str):
-        """Synchronous Docker build operation."""
-        build_output = []
+    async def _ensure_base_images(self, dockerfile_content: str):
+        """Build any shared base image the Dockerfile uses that isn't present yet."""
+        import docker
+        from docker.errors import ImageNotFound
+
+        for tag, base_dockerfile in BASE_IMAGES.items():
+            if f"FROM {tag}" not in dockerfile_content:
+                continue
+            try:
+                await self._call(self.client.images.get, tag)
+                continue
+            except ImageNotFound:
+                pass
+
+            logger.info(f"Building base image {tag}")
+            with docker.utils.mkbuildcontext(io.BytesIO(base_dockerfile.encode())) as context:
+                await self._stream_build(
+                    context,
+                    {"t": tag, "rm": 1, "forcerm": 1, "networkmode": "host"},
+                )
+            logger.info(f"Successfully built base image {tag}")
+
+    def _build_context(self, repo_path: str, dockerfile_content: str) -> IO[bytes]:
+        """
+        Pack the repository into a tar build context, honoring .dockerignore.
+
+        The generated Dockerfile is added as an extra archive member rather
+        than written into the repository, along with the empty context stub
+        generated Dockerfiles COPY from.
+        """
+        from docker.utils.build import create_archive, exclude_paths
+
+        root = os.path.abspath(repo_path)
+        exclude = []
+        dockerignore = Path(root) / ".dockerignore"
+        if dockerignore.exists():
+            lines = (line.strip() for line in dockerignore.read_text().splitlines())
+            exclude = [line for line in lines if line and not line.startswith("#")]
+
+        extra_files = [(DOCKERFILE_NAME, dockerfile_content), (CONTEXT_STUB_NAME, "")]
+        if exclude:
+            # Re-include the stub in case the repo's patterns would drop it
+            extra_files.append((".dockerignore", "\n".join(exclude + [f"!{CONTEXT_STUB_NAME}"]) + "\n"))
+
+        return create_archive(
+            root=root,
+            files=sorted(exclude_paths(root, exclude, dockerfile=DOCKERFILE_NAME)),
+            fileobj=tempfile.SpooledTemporaryFile(max_size=CONTEXT_SPOOL_SIZE),
+            extra_files=extra_files,
+        )
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """Get or create the async client used to stream builds from the Engine API."""
+        if self._http is None or self._http.is_closed:
+            api = self.client.api
+            # Builds can go quiet for minutes inside a single RUN step
+            timeout = httpx.Timeout(60.0, read=None)
+            if self._socket_path:
+                self._http = httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(uds=self._socket_path),
+                    base_url="http://docker",
+                    timeout=timeout,
+                )
+            else:
+                self._http = httpx.AsyncClient(
+                    base_url=api.base_url,
+                    verify=api.verify,
+                    cert=api.cert,
+                    timeout=timeout,
+                )
+        return self._http
+
+    async def _stream_build(
+        self,
+        context: IO[bytes],
+        params: dict
+    ):
+        """POST a build context to the Engine API, consuming output as it streams."""
+        # Only the tail of the log is ever reported, so only the tail is kept
+        build_output: deque[str] = deque(maxlen=BUILD_LOG_TAIL)
         try:
-            image, build_logs = self.client.images.build(
-                path=repo_path,
-                dockerfile="Dockerfile.opentrace",
-                tag=image_tag,
-                rm=True,  # Remove intermediate containers
-                forcerm=True,  # Always remove intermediate containers
-                network_mode="host",  # Use host network for npm/pip to access internet
-            )
-            # Log build output for debugging
-            for log in build_logs:
-                if 'stream' in log:
-                    msg = log['stream'].strip()
-                    if msg:
-                        build_output.append(msg)
-                        logger.debug(msg)
-                elif 'error' in log:
-                    error_msg = log['error']
-                    build_output.append(f"ERROR: {error_msg}")
-                    logger.error(f"Build error: {error_msg}")
-                    raise Exception(f"Build error: {error_msg}\n\nBuild log:\n" + "\n".join(build_output[-20:]))
-            logger.info(f"Successfully built image {image_tag}")
+            http = self._get_http()
+            async with http.stream(
+                "POST",
+                f"/v{self.client.api.api_version}/build",
+                params=params,
+                headers={"Content-Type": "application/x-tar"},
+                content=_iter_file(context, self._executor),
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise Exception(f"Docker API error: {response.status_code} - {response.text}")
+
+                # Log build output for debugging
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    log = orjson.loads(line)
+                    if 'stream' in log:
+                        msg = log['stream'].strip()
+                        if msg:
+                            build_output.append(msg)
+                            logger.debug(msg)
+                    elif 'error' in log:
+                        error_msg = log['error']
+                        build_output.append(f"ERROR: {error_msg}")
+                        logger.error(f"Build error: {error_msg}")
+                        raise Exception(f"Build error: {error_msg}\n\nBuild log:\n" + "\n".join(list(build_output)[-20:]))
         except Exception as e:
             # Include last 30 lines of build output in error for debugging
-            error_context = "\n".join(build_output[-30:]) if build_output else "No build output captured"
+            error_context = "\n".join(build_output) if build_output else "No build output captured"
             full_error = f"Docker build failed: {e}\n\nLast build output:\n{error_context}"
             logger.error(full_error)
-            raise Exception(full_error)
+            raise Exception(full_error) from e
 
     async def run_container(
         self,
@@ -143,45 +356,64 @@ class ContainerRunner:
         if not self.is_available():
             return None, "Docker is not available"
 
-        try:
-            # Remove existing container with same name if exists
-            try:
-                existing = self.client.containers.get(container_name)
-                existing.remove(force=True)
-            except Exception:
-                pass
+        from docker.errors import ImageNotFound, APIError
 
-            # Run container with network
-            container = self.client.containers.run(
+        try:
+            api = self.client.api
+            create = functools.partial(
+                api.create_container,
                 image_tag,
                 name=container_name,
                 detach=True,
-                ports={f"{port}/tcp": host_port},
-                environment={
+                ports=[port],
+                environment=_BASE_OTEL_ENV | {
                     "OTEL_SERVICE_NAME": service_name,
                     "OTEL_EXPORTER_OTLP_ENDPOINT": otel_endpoint,
                 },
-                network=network,
+                host_config=api.create_host_config(
+                    port_bindings={port: host_port},
+                    network_mode=network,
+                ),
             )
+
+            # Create directly, only clearing out a same-named container if the
+            # daemon reports a conflict. This also covers a retried create whose
+            # first attempt reached the daemon.
+            try:
+                container = await self._call(create)
+            except APIError as e:
+                if e.status_code != 409:
+                    raise
+                await self._call(api.remove_container, container_name, force=True)
+                container = await self._call(create)
+            container_id = container["Id"]
+            await self._call(api.start, container_id)
             
             logger.info(f"Started container {container_name} on network {network}")
 
-            return container.id, None
+            return container_id, None
 
         except ImageNotFound:
             return None, f"Image {image_tag} not found. Did you build it first?"
         except APIError as e:
             return None, f"Docker API error: {e}"
         except Exception as e:
+            self._note_failure(e)
             logger.error(f"Failed to run container: {e}")
             return None, str(e)
 
-    async def stop_container(self, container_id: str) -> tuple[bool, Optional[str]]:
+    async def stop_container(
+        self,
+        container_id: str,
+        graceful: bool = False
+    ) -> tuple[bool, Optional[str]]:
         """
         Stop a running container.
 
         Args:
             container_id: ID of the container to stop
+            graceful: Send SIGTERM and wait up to 10s before removing, instead
+                of a single forced remove
 
         Returns:
             Tuple of (success, error_message)
@@ -190,11 +422,16 @@ class ContainerRunner:
             return False, "Docker is not available"
 
         try:
-            container = self.client.containers.get(container_id)
-            container.stop(timeout=10)
-            container.remove()
+            if graceful:
+                # SIGTERM first so the app can flush buffered spans before it exits
+                await self._call(self.client.api.stop, container_id, timeout=10)
+                await self._call(self.client.api.remove_container, container_id, v=True)
+            else:
+                # One API call: kill the container if running and remove it with its volumes
+                await self._call(self.client.api.remove_container, container_id, force=True, v=True)
             return True, None
         except Exception as e:
+            self._note_failure(e)
             logger.error(f"Failed to stop container: {e}")
             return False, str(e)
 
@@ -204,9 +441,10 @@ class ContainerRunner:
             return None
 
         try:
-            container = self.client.containers.get(container_id)
+            container = self._with_retry(self.client.containers.get, container_id)
             return container.status
-        except Exception:
+        except Exception as e:
+            self._note_failure(e)
             return None
 
     def get_container_logs(self, container_id: str, tail: int = 100) -> Optional[str]:
@@ -215,20 +453,34 @@ class ContainerRunner:
             return None
 
         try:
-            container = self.client.containers.get(container_id)
-            logs = container.logs(tail=tail, timestamps=True)
-            return logs.decode("utf-8")
-        except Exception:
+            container = self._with_retry(self.client.containers.get, container_id)
+            # Frames are decoded as they arrive rather than from one buffered body;
+            # only opening the stream is retried, not reading it
+            frames = self._with_retry(container.logs, tail=tail, timestamps=True, stream=True, follow=False)
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            return "".join(decoder.decode(frame) for frame in frames) + decoder.decode(b"", final=True)
+        except Exception as e:
+            self._note_failure(e)
             return None
 
 
 # Global runner instance
 _runner: Optional[ContainerRunner] = None
+_runner_lock = threading.Lock()
 
 
 def get_container_runner() -> ContainerRunner:
     """Get the global container runner instance."""
     global _runner
     if _runner is None:
-        _runner = ContainerRunner()
+        # Creating a runner connects to Docker; make sure only one thread does it
+        with _runner_lock:
+            if _runner is None:
+                _runner = ContainerRunner()
     return _runner
+
+
+async def close_container_runner():
+    """Close the global runner's clients, if one was created."""
+    if _runner is not None:
+        await _runner.close()
@@ -1,17 +1,22 @@
 """Generate static architecture graph from OpenAPI spec."""
 
+from functools import lru_cache
 from typing import Optional
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from .models import FlowGraph, FlowNode, FlowEdge, FlowMeta, NodeData, EdgeData
 
 
+# Methods FastAPI adds implicitly, left out of the graph
+_IMPLICIT_METHODS = frozenset({"HEAD", "OPTIONS"})
+
+
+@lru_cache(maxsize=1024)
 def get_route_group(path: str) -> str:
     """Extract the route group (first path segment) from a path."""
-    parts = path.strip("/").split("/")
-    if parts and parts[0]:
-        return parts[0]
-    return "root"
+    path = path.strip("/")
+    end = path.find("/")
+    return (path[:end] if end >= 0 else path) or "root"
 
 
 def openapi_to_static_graph(app: FastAPI) -> FlowGraph:
@@ -28,35 +33,35 @@ def openapi_to_static_graph(app: FastAPI) -> FlowGraph:
     route_groups: dict[str, list[str]] = {}
 
     # Collect routes by group
-    for route in app.routes:
-        if isinstance(route, APIRoute):
-            path = route.path
-            methods = list(route.methods - {"HEAD", "OPTIONS"})
-            group = get_route_group(path)
-
-            if group not in route_groups:
-                route_groups[group] = []
-
-            for method in methods:
-                route_id = f"route:{method}:{path}"
-                route_groups[group].append(route_id)
-
-                # Create route node
-                node = FlowNode(
-                    id=route_id,
-                    type="route",
-                    position={"x": 0, "y": 0},
-                    data=NodeData(
-                        spanId=route_id,
-                        operationName=f"{method} {path}",
-                        serviceName=group,
-                        duration=0,
-                        startTime=0,
-                        status="success",
-                        tags={"method": method, "path": path}
-                    )
+    api_routes = [route for route in app.routes if isinstance(route, APIRoute)]
+    for route in api_routes:
+        path = route.path
+        methods = tuple(route.methods - _IMPLICIT_METHODS)
+        group = get_route_group(path)
+
+        if group not in route_groups:
+            route_groups[group] = []
+
+        for method in methods:
+            route_id = f"route:{method}:{path}"
+            route_groups[group].append(route_id)
+
+            # Create route node
+            node = FlowNode(
+                id=route_id,
+                type="route",
+                position={"x": 0, "y": 0},
+                data=NodeData(
+                    spanId=route_id,
+                    operationName=f"{method} {path}",
+                    serviceName=group,
+                    duration=0,
+                    startTime=0,
+                    status="success",
+                    tags={"method": method, "path": path}
                 )
-                nodes.append(node)
+            )
+            nodes.append(node)
 
     # Create group nodes and edges
     for group, route_ids in route_groups.items():
@@ -108,13 +113,12 @@ def merge_static_and_runtime(
     The static graph provides the architectural context,
     while the runtime graph shows actual execution.
     """
-    # Start with static nodes (marked as background)
-    merged_nodes = []
-    for node in static_graph.nodes:
-        # Mark static nodes differently
-        node_dict = node.model_dump()
-        node_dict["type"] = f"static-{node.type}"
-        merged_nodes.append(FlowNode(**node_dict))
+    # Start with static nodes (marked as background). model_copy only swaps
+    # the type, without a dump and re-validation round trip
+    merged_nodes = [
+        node.model_copy(update={"type": f"static-{node.type}"})
+        for node in static_graph.nodes
+    ]
 
     # Add runtime nodes
     for node in runtime_graph.nodes:
@@ -0,0 +1,92 @@
+"""Tests for the batch runtime flow endpoint."""
+
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.tests.test_trace_to_graph import SAMPLE_TRACE, TRACE_WITH_ERRORS
+
+
+class FakeJaeger:
+    """Serves traces from a dict and records which IDs were requested."""
+
+    def __init__(self, traces: dict[str, dict]):
+        self.traces = traces
+        self.requested: list[str] = []
+
+    async def get_trace(self, trace_id: str):
+        self.requested.append(trace_id)
+        trace = self.traces.get(trace_id)
+        return copy.deepcopy(trace) if trace else None
+
+
+@pytest.fixture
+def jaeger(monkeypatch):
+    fake = FakeJaeger({
+        "abc123def456": SAMPLE_TRACE,
+        "error123": TRACE_WITH_ERRORS,
+    })
+    monkeypatch.setattr(main, "get_jaeger_client", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+class TestGetRuntimeFlows:
+    def test_preserves_request_order(self, client, jaeger):
+        response = client.get("/flows/runtime", params={"ids": "error123,abc123def456"})
+
+        assert response.status_code == 200
+        graphs = response.json()
+        assert [g["meta"]["traceId"] for g in graphs] == ["error123", "abc123def456"]
+
+    def test_matches_single_flow_output(self, client, jaeger):
+        batch = client.get("/flows/runtime", params={"ids": "abc123def456"}).json()
+        single = client.get("/flows/runtime/abc123def456").json()
+
+        assert batch == [single]
+
+    def test_skips_missing_ids(self, client, jaeger):
+        response = client.get("/flows/runtime", params={"ids": "missing,abc123def456,gone"})
+
+        assert response.status_code == 200
+        assert [g["meta"]["traceId"] for g in response.json()] == ["abc123def456"]
+        assert jaeger.requested == ["missing", "abc123def456", "gone"]
+
+    def test_all_missing_returns_empty_list(self, client, jaeger):
+        response = client.get("/flows/runtime", params={"ids": "missing"})
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_ignores_blank_ids(self, client, jaeger):
+        response = client.get("/flows/runtime", params={"ids": " abc123def456 ,, "})
+
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        assert jaeger.requested == ["abc123def456"]
+
+    def test_empty_list_is_rejected(self, client, jaeger):
+        response = client.get("/flows/runtime", params={"ids": " , "})
+
+        assert response.status_code == 400
+        assert jaeger.requested == []
+
+    def test_accepts_max_batch_size(self, client, jaeger):
+        ids = ["abc123def456"] * main.MAX_BATCH_TRACES
+        response = client.get("/flows/runtime", params={"ids": ",".join(ids)})
+
+        assert response.status_code == 200
+        assert len(response.json()) == main.MAX_BATCH_TRACES
+
+    def test_over_limit_is_rejected(self, client, jaeger):
+        ids = ["abc123def456"] * (main.MAX_BATCH_TRACES + 1)
+        response = client.get("/flows/runtime", params={"ids": ",".join(ids)})
+
+        assert response.status_code == 400
+        assert jaeger.requested == []
@@ -0,0 +1,143 @@
+"""Tests for the Jaeger client's trace cache."""
+
+import httpx
+import orjson
+import pytest
+
+from app import jaeger_client
+from app.jaeger_client import JaegerClient
+from app.tests.test_trace_to_graph import SAMPLE_TRACE, TRACE_WITH_ERRORS
+
+# Newest span end in SAMPLE_TRACE / TRACE_WITH_ERRORS, in seconds since the epoch
+TRACE_END = 1700000000.25
+
+
+class FakeClock:
+    """Stands in for the time module with a controllable wall and monotonic clock."""
+
+    def __init__(self, now: float):
+        self.now = now
+        self.elapsed = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+
+def make_trace(trace_id: str) -> dict:
+    """A settled copy of SAMPLE_TRACE under another ID."""
+    trace = orjson.loads(orjson.dumps(SAMPLE_TRACE))
+    trace["traceID"] = trace_id
+    return trace
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock(TRACE_END + 3600)
+    monkeypatch.setattr(jaeger_client, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def traces():
+    return {
+        "abc123def456": SAMPLE_TRACE,
+        "error123": TRACE_WITH_ERRORS,
+        "other1": make_trace("other1"),
+    }
+
+
+@pytest.fixture
+def requested():
+    return []
+
+
+@pytest.fixture
+def client(traces, requested):
+    def handler(request: httpx.Request) -> httpx.Response:
+        trace_id = request.url.path.rsplit("/", 1)[-1]
+        requested.append(trace_id)
+        trace = traces.get(trace_id)
+        if trace is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=orjson.dumps({"data": [trace]}))
+
+    jaeger = JaegerClient("http://jaeger")
+    jaeger._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://jaeger"
+    )
+    return jaeger
+
+
+class TestTraceCache:
+    @pytest.mark.asyncio
+    async def test_hit_within_ttl_skips_refetch(self, client, clock, requested):
+        first = await client.get_trace("abc123def456")
+        clock.elapsed += client._trace_cache_ttl / 2
+        second = await client.get_trace("abc123def456")
+
+        assert first == second == SAMPLE_TRACE
+        assert requested == ["abc123def456"]
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_refetched(self, client, clock, requested):
+        await client.get_trace("abc123def456")
+        clock.elapsed += client._trace_cache_ttl
+        await client.get_trace("abc123def456")
+
+        assert requested == ["abc123def456", "abc123def456"]
+
+    @pytest.mark.asyncio
+    async def test_unsettled_trace_is_not_stored(self, client, clock, requested):
+        # Newest span ended just now, so more spans may still arrive
+        clock.now = TRACE_END + 1
+
+        await client.get_trace("abc123def456")
+        await client.get_trace("abc123def456")
+
+        assert "abc123def456" not in client._trace_cache
+        assert requested == ["abc123def456", "abc123def456"]
+
+    @pytest.mark.asyncio
+    async def test_missing_trace_is_not_stored(self, client, clock, requested):
+        assert await client.get_trace("missing") is None
+        assert await client.get_trace("missing") is None
+
+        assert requested == ["missing", "missing"]
+
+    @pytest.mark.asyncio
+    async def test_callers_get_independent_copies(self, client, clock):
+        first = await client.get_trace("abc123def456")
+        first["spans"].clear()
+        second = await client.get_trace("abc123def456")
+        second["traceID"] = "changed"
+        third = await client.get_trace("abc123def456")
+
+        assert third == SAMPLE_TRACE
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self, client, clock, requested):
+        client._trace_cache_size = 2
+
+        await client.get_trace("abc123def456")
+        await client.get_trace("error123")
+        # Touch the oldest entry so error123 becomes least recently used
+        await client.get_trace("abc123def456")
+        await client.get_trace("other1")
+
+        assert list(client._trace_cache) == ["abc123def456", "other1"]
+
+        await client.get_trace("error123")
+        assert requested == ["abc123def456", "error123", "other1", "error123"]
+
+    @pytest.mark.asyncio
+    async def test_zero_size_disables_cache(self, client, clock, requested):
+        client._trace_cache_size = 0
+
+        await client.get_trace("abc123def456")
+        await client.get_trace("abc123def456")
+
+        assert not client._trace_cache
+        assert requested == ["abc123def456", "abc123def456"]
@@ -0,0 +1,168 @@
+"""Tests for the repo manager: eviction, the host port pool and endpoint detection."""
+
+from collections import deque
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.models import RepoInfo, RepoLanguage, RepoStatus
+from app.repo_analyzer import manager as manager_module
+from app.repo_analyzer.manager import RepoManager
+
+
+class FakeRunner:
+    """Builds succeed; run_container replays the queued (container_id, error) results."""
+
+    def __init__(self, run_results: list[tuple]):
+        self.run_results = list(run_results)
+        self.host_ports: list[int] = []
+
+    async def build_image(self, repo_path, image_tag, dockerfile_content):
+        return True, None
+
+    async def run_container(self, image_tag, container_name, port, host_port, service_name):
+        self.host_ports.append(host_port)
+        return self.run_results.pop(0)
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """Shrink the repo cap and port range so the pool can be filled in a test."""
+    monkeypatch.setattr(manager_module, "MAX_REPOS", 3)
+    monkeypatch.setattr(manager_module, "PORT_RANGE", range(9000, 9003))
+
+
+@pytest.fixture
+def manager(small_pool):
+    return RepoManager()
+
+
+def add_repo(manager: RepoManager, repo_id: str, status: RepoStatus) -> RepoInfo:
+    """Track a repo the way analyze() does, without cloning anything."""
+    repo_info = RepoInfo(
+        repoId=repo_id,
+        githubUrl=f"https://github.com/example/{repo_id}",
+        status=status,
+        port=manager._get_next_port(),
+        language=RepoLanguage.PYTHON,
+    )
+    manager.repos[repo_id] = repo_info
+    manager._agent_analysis[repo_id] = {"dockerfile": "FROM python:3.11-slim", "port": 8000}
+    return repo_info
+
+
+class TestEviction:
+    def test_under_cap_keeps_everything(self, manager):
+        add_repo(manager, "first", RepoStatus.READY)
+        add_repo(manager, "second", RepoStatus.STOPPED)
+
+        manager._evict_if_needed()
+
+        assert list(manager.repos) == ["first", "second"]
+
+    def test_busy_repos_are_never_evicted(self, manager):
+        add_repo(manager, "analyzing", RepoStatus.ANALYZING)
+        add_repo(manager, "building", RepoStatus.BUILDING)
+        add_repo(manager, "running", RepoStatus.RUNNING)
+
+        manager._evict_if_needed()
+
+        assert list(manager.repos) == ["analyzing", "building", "running"]
+        assert set(manager._agent_analysis) == {"analyzing", "building", "running"}
+
+    def test_evicts_least_recently_used_idle_repo(self, manager):
+        add_repo(manager, "running", RepoStatus.RUNNING)
+        add_repo(manager, "viewed", RepoStatus.ERROR)
+        add_repo(manager, "idle", RepoStatus.READY)
+        manager.get_repo("viewed")  # Now more recently used than "idle"
+
+        manager._evict_if_needed()
+
+        assert list(manager.repos) == ["running", "viewed"]
+        assert set(manager._agent_analysis) == {"running", "viewed"}
+
+
+class TestPortPool:
+    def test_evicted_repo_port_is_reused(self, manager):
+        oldest = add_repo(manager, "oldest", RepoStatus.READY)
+        add_repo(manager, "middle", RepoStatus.READY)
+        add_repo(manager, "newest", RepoStatus.READY)
+
+        manager._evict_if_needed()
+
+        assert "oldest" not in manager.repos
+        assert manager._get_next_port() == oldest.port
+
+    def test_exhausted_pool_returns_503(self, manager, monkeypatch):
+        manager._free_ports = deque()
+        monkeypatch.setattr(main, "get_repo_manager", lambda: manager)
+
+        response = TestClient(main.app).post(
+            "/repos/analyze", json={"githubUrl": "https://github.com/example/repo"}
+        )
+
+        assert response.status_code == 503
+        assert not manager.repos
+
+    @pytest.mark.asyncio
+    async def test_port_conflict_moves_to_next_port(self, manager, monkeypatch):
+        runner = FakeRunner([
+            (None, "Bind for 0.0.0.0:9000 failed: port is already allocated"),
+            ("container123", None),
+        ])
+        monkeypatch.setattr(manager_module, "get_container_runner", lambda: runner)
+        repo_info = add_repo(manager, "repo", RepoStatus.READY)
+
+        await manager.start("repo")
+
+        assert runner.host_ports == [9000, 9001]
+        assert repo_info.status == RepoStatus.RUNNING
+        assert repo_info.port == 9001
+        assert repo_info.container_id == "container123"
+        # The busy port goes to the back of the pool
+        assert list(manager._free_ports) == [9002, 9000]
+
+    @pytest.mark.asyncio
+    async def test_other_run_errors_are_not_retried(self, manager, monkeypatch):
+        runner = FakeRunner([(None, "exec format error")])
+        monkeypatch.setattr(manager_module, "get_container_runner", lambda: runner)
+        repo_info = add_repo(manager, "repo", RepoStatus.READY)
+
+        await manager.start("repo")
+
+        assert runner.host_ports == [9000]
+        assert repo_info.status == RepoStatus.ERROR
+        assert repo_info.port == 9000
+
+
+ROUTES_SOURCE = b'''
+@app.get("/items")
+def list_items(): ...
+
+@router.patch("/items/{item_id}")
+def update_item(item_id): ...
+'''
+
+
+class TestDetectEndpoints:
+    def test_ast_and_regex_scans_agree(self, manager, tmp_path, monkeypatch):
+        (tmp_path / "main.py").write_bytes(ROUTES_SOURCE)
+
+        parsed = manager._detect_endpoints(tmp_path, RepoLanguage.PYTHON, "main.py")
+        monkeypatch.setattr(manager_module, "MAX_AST_PARSE_SIZE", 0)
+        scanned = manager._detect_endpoints(tmp_path, RepoLanguage.PYTHON, "main.py")
+
+        assert parsed == scanned == ["/items", "/items/{item_id}"]
+
+    def test_unexpected_parse_error_falls_back_to_scan(self, manager, tmp_path, monkeypatch):
+        (tmp_path / "main.py").write_bytes(ROUTES_SOURCE)
+
+        def fail(source):
+            raise RecursionError("too deeply nested")
+
+        monkeypatch.setattr(manager, "_detect_python_routes", fail)
+
+        endpoints = manager._detect_endpoints(tmp_path, RepoLanguage.PYTHON, "main.py")
+
+        assert endpoints == ["/items", "/items/{item_id}"]
@@ -1,5 +1,8 @@
 """Convert Jaeger trace data to ReactFlow graph format."""
 
+import heapq
+import sys
+from dataclasses import dataclass, field
 from typing import Any, Optional
 from .models import (
     FlowGraph, FlowNode, FlowEdge, FlowMeta,
@@ -15,24 +18,58 @@ def extract_tag_value(tags: list[dict], key: str) -> Optional[Any]:
     return None
 
 
-def has_error(span: dict) -> bool:
-    """Check if a span has an error tag."""
-    tags = span.get("tags", [])
-    error_tag = extract_tag_value(tags, "error")
-    if error_tag is True:
-        return True
+# Tags that decide whether a span is an error
+_ERROR_TAG_KEYS = frozenset({"error", "http.status_code", "otel.status_code"})
+
+# Internal OTel tag prefixes that aren't useful to display
+_HIDDEN_TAG_PREFIXES = ("otel.", "telemetry.")
+
+
+def scan_tags(
+    tags: list[dict],
+    names: Optional[dict[str, str]] = None
+) -> tuple[dict[str, Any], bool]:
+    """
+    Convert Jaeger tags to a display dictionary and detect errors in one pass.
+
+    Args:
+        tags: Jaeger tags list
+        names: Optional cache used to share one string per distinct tag key
+
+    Returns:
+        Tuple of (tags dict without internal OTel tags, whether the span errored)
+    """
+    result = {}
+    error_values: dict[str, Any] = {}
+    for tag in tags:
+        key = tag.get("key", "")
+        if names is not None:
+            key = names.setdefault(key, key)
+        value = tag.get("value")
+        # The first occurrence of an error tag decides, as with extract_tag_value
+        if key in _ERROR_TAG_KEYS and key not in error_values:
+            error_values[key] = value
+        if not key.startswith(_HIDDEN_TAG_PREFIXES):
+            result[key] = value
+
+    if not error_values:
+        return result, False
+
+    if error_values.get("error") is True:
+        return result, True
 
     # Check for HTTP 5xx status codes
-    http_status = extract_tag_value(tags, "http.status_code")
+    http_status = error_values.get("http.status_code")
     if http_status and int(http_status) >= 500:
-        return True
+        return result, True
 
     # Check for otel.status_code = ERROR
-    otel_status = extract_tag_value(tags, "otel.status_code")
-    if otel_status == "ERROR":
-        return True
+    return result, error_values.get("otel.status_code") == "ERROR"
 
-    return False
+
+def has_error(span: dict) -> bool:
+    """Check if a span has an error tag."""
+    return scan_tags(span.get("tags", []))[1]
 
 
 def get_parent_span_id(span: dict) -> Optional[str]:
@@ -44,19 +81,48 @@ def get_parent_span_id(span: dict) -> Optional[str]:
     return None
 
 
-def tags_to_dict(tags: list[dict]) -> dict[str, Any]:
-    """Convert Jaeger tags list to a dictionary."""
-    result = {}
-    for tag in tags:
-        key = tag.get("key", "")
-        value = tag.get("value")
-        # Filter out internal OTel tags that aren't useful to display
-        if not key.startswith("otel.") and not key.startswith("telemetry."):
-            result[key] = value
-    return result
+@dataclass
+class TraceIndex:
+    """
+    Per-trace lookups shared by the graph conversion and analysis passes.
 
+    Built once with build_trace_index; per-span lists are indexed by the
+    span's position in the trace's span list.
+    """
+    spans: list[dict]
+    span_map: dict[str, dict] = field(default_factory=dict)
+    parent_ids: list[Optional[str]] = field(default_factory=list)
+    children: dict[str, list[str]] = field(default_factory=dict)
+    root_ids: list[str] = field(default_factory=list)
+    tags: list[dict[str, Any]] = field(default_factory=list)
+    error_flags: list[bool] = field(default_factory=list)
+
+
+def build_trace_index(trace_data: dict) -> TraceIndex:
+    """Index a trace's spans by ID, parent, display tags and error status in a single pass."""
+    index = TraceIndex(spans=trace_data.get("spans", []))
+    # The same few tag keys repeat on every span; keep one copy of each
+    tag_names: dict[str, str] = {}
+
+    for span in index.spans:
+        span_id = span.get("spanID", "")
+        index.span_map[span_id] = span
 
-def trace_to_reactflow(trace_data: dict) -> FlowGraph:
+        parent_id = get_parent_span_id(span)
+        index.parent_ids.append(parent_id)
+        if parent_id:
+            index.children.setdefault(parent_id, []).append(span_id)
+        else:
+            index.root_ids.append(span_id)
+
+        tags, error = scan_tags(span.get("tags", []), tag_names)
+        index.tags.append(tags)
+        index.error_flags.append(error)
+
+    return index
+
+
+def trace_to_reactflow(trace_data: dict, index: Optional[TraceIndex] = None) -> FlowGraph:
     """
     Convert Jaeger trace format to ReactFlow nodes and edges.
 
@@ -80,37 +146,43 @@ def trace_to_reactflow(trace_data: dict) -> FlowGraph:
             "p1": {"serviceName": "my-service", "tags": []}
         }
     }
+
+    Pass a prebuilt index to share it with the analysis functions.
     """
+    if index is None:
+        index = build_trace_index(trace_data)
     trace_id = trace_data.get("traceID", "unknown")
-    spans = trace_data.get("spans", [])
+    spans = index.spans
     processes = trace_data.get("processes", {})
 
     nodes: list[FlowNode] = []
     edges: list[FlowEdge] = []
     services: set[str] = set()
+    # Spans repeat a handful of service and operation names; share one string for each
+    operation_names: dict[str, str] = {}
 
     # Track min/max times for duration calculation
     min_time = float("inf")
     max_time = 0
 
-    for span in spans:
+    for i, span in enumerate(spans):
         span_id = span.get("spanID", "")
         process_id = span.get("processID", "")
         process = processes.get(process_id, {})
-        service_name = process.get("serviceName", "unknown")
+        service_name = sys.intern(process.get("serviceName", "unknown"))
         services.add(service_name)
 
         operation_name = span.get("operationName", "unknown")
+        operation_name = operation_names.setdefault(operation_name, operation_name)
         start_time = span.get("startTime", 0)  # microseconds
         duration = span.get("duration", 0)  # microseconds
-        tags = span.get("tags", [])
 
         # Update time bounds
         min_time = min(min_time, start_time)
         max_time = max(max_time, start_time + duration)
 
         # Determine status
-        status = "error" if has_error(span) else "success"
+        status = "error" if index.error_flags[i] else "success"
 
         # Create node
         node_data = NodeData(
@@ -120,7 +192,7 @@ def trace_to_reactflow(trace_data: dict) -> FlowGraph:
             duration=duration / 1000,  # Convert to milliseconds
             startTime=start_time,
             status=status,
-            tags=tags_to_dict(tags)
+            tags=index.tags[i]
         )
 
         node = FlowNode(
@@ -132,13 +204,14 @@ def trace_to_reactflow(trace_data: dict) -> FlowGraph:
         nodes.append(node)
 
         # Create edge from parent
-        parent_span_id = get_parent_span_id(span)
+        parent_span_id = index.parent_ids[i]
         if parent_span_id:
-            edge = FlowEdge(
+            # Fields are built here from known-good values, so skip validation
+            edge = FlowEdge.model_construct(
                 id=f"edge:{parent_span_id}-{span_id}",
                 source=f"span:{parent_span_id}",
                 target=f"span:{span_id}",
-                data=EdgeData(type="childOf"),
+                data=EdgeData.model_construct(type="childOf"),
                 animated=status == "error"  # Animate error edges
             )
             edges.append(edge)
@@ -169,77 +242,79 @@ def find_root_spans(trace_data: dict) -> list[dict]:
     return root_spans
 
 
-def find_critical_path(trace_data: dict) -> list[str]:
+def find_critical_path(trace_data: dict, index: Optional[TraceIndex] = None) -> list[str]:
     """
     Find the critical path through the trace (longest path by duration).
     Returns list of span IDs in order from root to leaf.
     """
-    spans = trace_data.get("spans", [])
-    if not spans:
+    if index is None:
+        index = build_trace_index(trace_data)
+    if not index.spans:
         return []
 
-    # Build span lookup and children map
-    span_map = {s["spanID"]: s for s in spans}
-    children_map: dict[str, list[str]] = {}
-
-    for span in spans:
-        span_id = span["spanID"]
-        parent_id = get_parent_span_id(span)
-        if parent_id:
-            if parent_id not in children_map:
-                children_map[parent_id] = []
-            children_map[parent_id].append(span_id)
-
-    def get_path_duration(span_id: str, visited: set) -> tuple[float, list[str]]:
-        """Recursively find the longest path from this span."""
-        if span_id in visited:
-            return 0, []
-        visited.add(span_id)
-
-        span = span_map.get(span_id)
-        if not span:
-            return 0, []
-
-        duration = span.get("duration", 0)
-        children = children_map.get(span_id, [])
-
-        if not children:
-            return duration, [span_id]
-
-        # Find child with longest path
-        max_child_duration = 0
-        max_child_path: list[str] = []
-
-        for child_id in children:
-            child_duration, child_path = get_path_duration(child_id, visited.copy())
-            if child_duration > max_child_duration:
-                max_child_duration = child_duration
-                max_child_path = child_path
-
-        return duration + max_child_duration, [span_id] + max_child_path
-
-    # Find root spans and get longest path from each
-    root_spans = find_root_spans(trace_data)
-    longest_path: list[str] = []
+    # Longest duration from each span down to a leaf, and the child it goes through
+    best: dict[str, tuple[float, Optional[str]]] = {}
+    pending: set[str] = set()
+
+    for root_id in index.root_ids:
+        # Iterative post-order, so each span is scored once after its children.
+        # A span already pending is an ancestor reached again through a
+        # malformed reference cycle and counts as nothing.
+        stack = [root_id]
+        while stack:
+            span_id = stack[-1]
+            if span_id in best:
+                stack.pop()
+                continue
+            children = index.children.get(span_id, [])
+            if span_id not in pending:
+                pending.add(span_id)
+                stack.extend(c for c in children if c not in best and c not in pending)
+                continue
+            stack.pop()
+
+            # Find child with longest path
+            max_child_duration = 0
+            max_child_id = None
+            for child_id in children:
+                child_duration = best.get(child_id, (0, None))[0]
+                if child_duration > max_child_duration:
+                    max_child_duration = child_duration
+                    max_child_id = child_id
+
+            duration = index.span_map[span_id].get("duration", 0)
+            best[span_id] = (duration + max_child_duration, max_child_id)
+
+    # Pick the root with the longest path and follow it down
+    longest_root = None
     max_duration = 0
-
-    for root in root_spans:
-        duration, path = get_path_duration(root["spanID"], set())
+    for root_id in index.root_ids:
+        duration = best[root_id][0]
         if duration > max_duration:
             max_duration = duration
-            longest_path = path
+            longest_root = root_id
+
+    longest_path: list[str] = []
+    span_id = longest_root
+    while span_id is not None:
+        longest_path.append(span_id)
+        span_id = best[span_id][1]
 
     return longest_path
 
 
-def find_slowest_spans(trace_data: dict, n: int = 5) -> list[dict]:
+def find_slowest_spans(
+    trace_data: dict,
+    n: int = 5,
+    index: Optional[TraceIndex] = None
+) -> list[dict]:
     """Find the N slowest spans by duration."""
-    spans = trace_data.get("spans", [])
-    sorted_spans = sorted(spans, key=lambda s: s.get("duration", 0), reverse=True)
-    return sorted_spans[:n]
+    spans = index.spans if index is not None else trace_data.get("spans", [])
+    return heapq.nlargest(n, spans, key=lambda s: s.get("duration", 0))
 
 
-def find_error_spans(trace_data: dict) -> list[dict]:
+def find_error_spans(trace_data: dict, index: Optional[TraceIndex] = None) -> list[dict]:
     """Find all spans with errors."""
-    spans = trace_data.get("spans", [])
-    return [s for s in spans if has_error(s)]
+    if index is None:
+        return [s for s in trace_data.get("spans", []) if has_error(s)]
+    return [s for s, error in zip(index.spans, index.error_flags) if error]